@@ -1,7 +1,8 @@
 
 import numpy as np
 from OpenGL.GL import \
-    glGenBuffers, glBindBuffer, glBufferData, glBufferSubData, GL_ARRAY_BUFFER, GL_STATIC_DRAW
+    glGenBuffers, glDeleteBuffers, glBindBuffer, glBufferData, glBufferSubData, \
+    GL_ARRAY_BUFFER, GL_STATIC_DRAW, GL_DYNAMIC_DRAW
 
 from camviz.utils.utils import numpyf
 from camviz.utils.types import is_tuple, is_list, is_tensor, is_numpy
@@ -21,12 +22,16 @@ class Buffer:
         Numpy data type
     gltype : OpenGL type (e.g. GL_FLOAT32)
         OpenGL data type
+    attr : bool
+        If true, the buffer stores scalar attribute channels and keeps track of their ranges
     """
-    def __init__(self, data, dtype, gltype):
+    def __init__(self, data, dtype, gltype, attr=False):
         # Initialize buffer ID and max size
         self.id, self.max = glGenBuffers(1), 0
         # Store data types
         self.dtype, self.gltype = dtype, gltype
+        # Initialize attribute ranges
+        self.attr, self.lims = attr, None
         if is_tuple(data):
             # If data is a tuple, store dimensions
             data, (self.n, self.d) = None, data
@@ -34,6 +39,7 @@ class Buffer:
             # Process data and store dimensions
             data = self.process(data)
             self.n, self.d = data.shape[:2]
+            self.setLims(data)
         # If size is larger than available, recreate buffer
         if self.n > self.max:
             self._create(data)
@@ -78,6 +84,15 @@ class Buffer:
         # Return data
         return data
 
+    def setLims(self, data):
+        """Store per-channel ranges if the buffer stores attributes"""
+        if self.attr and data.size > 0:
+            self.lims = np.stack([data.min(0), data.max(0)], 1)
+
+    def range(self, channel=0):
+        """Return the range of an attribute channel"""
+        return (0.0, 1.0) if self.lims is None else self.lims[channel]
+
     def _create(self, data):
         """Create a new data buffer"""
         self.max = self.n
@@ -91,6 +106,7 @@ class Buffer:
         data = self.process(data)
         # Get dimensions or initialize as zero
         self.n = 0 if data.size == 0 else data.shape[0]
+        self.setLims(data)
         # If dimensions are larger than available, recreate
         if self.n > self.max:
             self._create(data)
@@ -101,10 +117,68 @@ class Buffer:
             glBufferSubData(GL_ARRAY_BUFFER, 0, self.size, data.astype(self.dtype))
             glBindBuffer(GL_ARRAY_BUFFER, 0)
 
+    def reserve(self, n):
+        """
+        Make sure the buffer can store n rows, growing it if necessary
+
+        Parameters
+        ----------
+        n : int
+            Number of rows to be stored
+
+        Returns
+        -------
+        grown : bool
+            True if the buffer was reallocated (previous contents are lost)
+        """
+        if n <= self.max:
+            return False
+        self.max = n
+        glBindBuffer(GL_ARRAY_BUFFER, self.id)
+        glBufferData(GL_ARRAY_BUFFER, n * self.d * np.dtype(self.dtype).itemsize, None, GL_DYNAMIC_DRAW)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+        return True
+
+    def write(self, data, offset=0):
+        """
+        Write rows to the buffer starting at a row offset, without touching the others
+
+        Parameters
+        ----------
+        data : np.array [N,D]
+            Data to be written
+        offset : int
+            First row to be written (the buffer must have capacity for offset + N rows)
+        """
+        data = self.process(data)
+        if data.size == 0:
+            return
+        n = data.shape[0]
+        assert offset + n <= self.max, 'Buffer capacity exceeded, reserve it first'
+        # Copy data to the requested rows
+        row = self.d * np.dtype(self.dtype).itemsize
+        glBindBuffer(GL_ARRAY_BUFFER, self.id)
+        glBufferSubData(GL_ARRAY_BUFFER, offset * row, n * row, data)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+        self.n = max(self.n, offset + n)
+        # Extend attribute ranges with the new data
+        if self.attr:
+            lims = self.lims
+            self.setLims(data)
+            if lims is not None:
+                self.lims = np.stack([np.minimum(lims[:, 0], self.lims[:, 0]),
+                                      np.maximum(lims[:, 1], self.lims[:, 1])], 1)
+
+    def delete(self):
+        """Release buffer memory (the buffer cannot be used afterwards)"""
+        if self.id is not None:
+            glDeleteBuffers(1, [self.id])
+            self.id, self.n, self.max = None, 0, 0
+
     def clear(self):
         """Clear buffer"""
         self.n = 0
 
-    def updateJET(self, data):
-        """Update buffer using a JET colormap"""
-        self.update(jet(data))
+    def updateJET(self, data, range=None):
+        """Update buffer using a JET colormap (range can be fixed or a RangeEstimator)"""
+        self.update(jet(data, range=range))
@@ -0,0 +1,81 @@
+# Copyright 2023 Toyota Research Institute.  All rights reserved.
+
+from OpenGL.GL import \
+    glGenFramebuffers, glBindFramebuffer, glDeleteFramebuffers, glFramebufferTexture2D, \
+    glFramebufferRenderbuffer, glCheckFramebufferStatus, glGenRenderbuffers, glBindRenderbuffer, \
+    glRenderbufferStorage, glDeleteRenderbuffers, glGenTextures, glBindTexture, glTexImage2D, \
+    glTexParameteri, glDeleteTextures, glGetIntegerv, \
+    GL_FRAMEBUFFER, GL_RENDERBUFFER, GL_COLOR_ATTACHMENT0, GL_DEPTH_ATTACHMENT, \
+    GL_FRAMEBUFFER_COMPLETE, GL_FRAMEBUFFER_BINDING, GL_RGBA8, GL_RGBA, GL_UNSIGNED_BYTE, \
+    GL_DEPTH_COMPONENT24, GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_TEXTURE_MAG_FILTER, GL_NEAREST
+
+
+class Framebuffer:
+    """
+    Initialize a framebuffer object with color and depth attachments
+
+    Parameters
+    ----------
+    wh : tuple (width, height)
+        Framebuffer dimensions
+    texture : bool
+        If true, the color attachment is a texture that can be drawn (otherwise a renderbuffer)
+    """
+    def __init__(self, wh, texture=False):
+        self.id = glGenFramebuffers(1)
+        self.texture, self.wh = texture, None
+        self.color = glGenTextures(1) if texture else glGenRenderbuffers(1)
+        self.depth = glGenRenderbuffers(1)
+        self.previous = []
+        self.resize(wh)
+
+    def resize(self, wh):
+        """Resize framebuffer attachments (contents are lost)"""
+        wh = (int(wh[0]), int(wh[1]))
+        if wh == self.wh:
+            return
+        self.wh = wh
+        self.bind()
+        # Create color attachment
+        if self.texture:
+            glBindTexture(GL_TEXTURE_2D, self.color)
+            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_NEAREST)
+            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_NEAREST)
+            glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA8, wh[0], wh[1], 0, GL_RGBA, GL_UNSIGNED_BYTE, None)
+            glBindTexture(GL_TEXTURE_2D, 0)
+            glFramebufferTexture2D(GL_FRAMEBUFFER, GL_COLOR_ATTACHMENT0, GL_TEXTURE_2D, self.color, 0)
+        else:
+            glBindRenderbuffer(GL_RENDERBUFFER, self.color)
+            glRenderbufferStorage(GL_RENDERBUFFER, GL_RGBA8, wh[0], wh[1])
+            glFramebufferRenderbuffer(GL_FRAMEBUFFER, GL_COLOR_ATTACHMENT0, GL_RENDERBUFFER, self.color)
+        # Create depth attachment
+        glBindRenderbuffer(GL_RENDERBUFFER, self.depth)
+        glRenderbufferStorage(GL_RENDERBUFFER, GL_DEPTH_COMPONENT24, wh[0], wh[1])
+        glFramebufferRenderbuffer(GL_FRAMEBUFFER, GL_DEPTH_ATTACHMENT, GL_RENDERBUFFER, self.depth)
+        glBindRenderbuffer(GL_RENDERBUFFER, 0)
+        # Check if framebuffer is valid
+        status = glCheckFramebufferStatus(GL_FRAMEBUFFER)
+        self.release()
+        if status != GL_FRAMEBUFFER_COMPLETE:
+            raise RuntimeError('Incomplete framebuffer (status %s)' % status)
+
+    def bind(self):
+        """Bind framebuffer for drawing and reading, storing the previous binding"""
+        self.previous.append(int(glGetIntegerv(GL_FRAMEBUFFER_BINDING)))
+        glBindFramebuffer(GL_FRAMEBUFFER, self.id)
+        return self
+
+    def release(self):
+        """Restore the framebuffer that was bound before"""
+        glBindFramebuffer(GL_FRAMEBUFFER, self.previous.pop() if len(self.previous) > 0 else 0)
+
+    def delete(self):
+        """Release framebuffer memory"""
+        if self.id is not None:
+            glDeleteFramebuffers(1, [self.id])
+            glDeleteRenderbuffers(1, [self.depth])
+            if self.texture:
+                glDeleteTextures([self.color])
+            else:
+                glDeleteRenderbuffers(1, [self.color])
+            self.id = None
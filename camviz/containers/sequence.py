@@ -0,0 +1,136 @@
+# Copyright 2023 Toyota Research Institute.  All rights reserved.
+
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from camviz.utils.image import load_rgb, load_depth
+from camviz.utils.types import is_str
+
+
+class Sequence:
+    """
+    Initialize a prefetching image sequence
+
+    Frames are decoded ahead of the playhead by a pool of worker threads, and
+    decoded frames are kept in a byte-bounded LRU cache for backwards scrubbing.
+    Returned frames can be used directly with updTexture (rgb, kept as uint8 to
+    save cache memory) or lifted and used with updBufferf (depth).
+
+    Parameters
+    ----------
+    files : list[str]
+        Frame filenames, in playback order
+    mode : str or function
+        Decoding mode ['rgb', 'depth'], or a function that receives a filename
+        and returns a numpy array
+    shape : tuple (width, height)
+        Optional reshape size
+    scale : float
+        Depth scale (only used in 'depth' mode)
+    prefetch : int
+        Number of frames decoded ahead of the playhead
+    workers : int
+        Number of decoding threads
+    max_bytes : int
+        Maximum size of the decoded frame cache, in bytes
+    """
+    def __init__(self, files, mode='rgb', shape=None, scale=256.0,
+                 prefetch=8, workers=4, max_bytes=1 << 30):
+        self.files = list(files)
+        self.shape, self.scale = shape, scale
+        self.prefetch, self.max_bytes = prefetch, max_bytes
+        # Select decoding function
+        if is_str(mode):
+            assert mode in ['rgb', 'depth'], 'Invalid sequence mode'
+            self.loader = self._load_rgb if mode == 'rgb' else self._load_depth
+        else:
+            self.loader = mode
+        # Initialize cache, pending decodes and playhead
+        self.cache, self.pending, self.bytes = OrderedDict(), {}, 0
+        self.lock = threading.Lock()
+        self.pool = ThreadPoolExecutor(max_workers=workers)
+        self.last, self.direction = None, 1
+
+    def __len__(self):
+        """Return sequence length"""
+        return len(self.files)
+
+    def __getitem__(self, idx):
+        """Return decoded frame, blocking only if it is not ready yet"""
+        idx = idx % len(self.files)
+        # Update playhead direction and schedule frames ahead of it
+        if self.last is not None and idx != self.last:
+            self.direction = 1 if idx > self.last else -1
+        self.last = idx
+        # Get frame from cache if available
+        with self.lock:
+            frame = self.cache.get(idx)
+            if frame is not None:
+                self.cache.move_to_end(idx)
+        if frame is None:
+            frame = self._submit(idx).result()
+        self._schedule(idx)
+        # Return frame
+        return frame
+
+    def _load_rgb(self, file):
+        """Decode an RGB frame (uint8, converted when uploaded as a texture)"""
+        return load_rgb(file, self.shape, dtype=np.uint8)
+
+    def _load_depth(self, file):
+        """Decode a depth frame"""
+        return load_depth(file, self.scale, self.shape)
+
+    def _decode(self, idx):
+        """Decode a frame and store it in the cache"""
+        frame = self.loader(self.files[idx])
+        with self.lock:
+            self.pending.pop(idx, None)
+            if idx not in self.cache:
+                self.cache[idx] = frame
+                self.bytes += frame.nbytes
+                # Evict least recently used frames until size fits
+                while self.bytes > self.max_bytes and len(self.cache) > 1:
+                    _, old = self.cache.popitem(last=False)
+                    self.bytes -= old.nbytes
+        return frame
+
+    def _submit(self, idx):
+        """Submit a frame for decoding, or return its pending future"""
+        with self.lock:
+            future = self.pending.get(idx)
+            if future is None:
+                future = self.pool.submit(self._decode, idx)
+                self.pending[idx] = future
+        return future
+
+    def _schedule(self, idx):
+        """Schedule frames ahead of the playhead and cancel stale ones"""
+        n = len(self.files)
+        ahead = [(idx + self.direction * i) % n for i in range(1, self.prefetch + 1)]
+        with self.lock:
+            # Cancel frames that are not needed anymore (if not started yet)
+            for key in list(self.pending.keys()):
+                if key != idx and key not in ahead and self.pending[key].cancel():
+                    del self.pending[key]
+            ahead = [key for key in ahead if key not in self.cache]
+        for key in ahead:
+            self._submit(key)
+
+    def clear(self):
+        """Clear decoded frame cache"""
+        with self.lock:
+            self.cache.clear()
+            self.bytes = 0
+
+    def close(self):
+        """Stop decoding threads and release cached frames"""
+        with self.lock:
+            for future in self.pending.values():
+                future.cancel()
+            self.pending.clear()
+        self.pool.shutdown(wait=False)
+        self.clear()
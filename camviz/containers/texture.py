@@ -4,7 +4,7 @@ import numpy as np
 import pygame
 from OpenGL.GL import \
     glEnable, glDisable, glTexParameterf, \
-    glBindTexture, glGenTextures, glTexImage2D, glTexSubImage2D, \
+    glBindTexture, glGenTextures, glDeleteTextures, glTexImage2D, glTexSubImage2D, \
     GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_TEXTURE_WRAP_T, GL_TEXTURE_MAG_FILTER, \
     GL_TEXTURE_MIN_FILTER, GL_REPEAT, GL_NEAREST, GL_RGB, GL_RGBA, GL_UNSIGNED_BYTE
 
@@ -41,6 +41,11 @@ def load(image):
     return pygame.image.tostring(surface, "RGBA", 1)
 
 
+def to255(image):
+    """Scale a [0,1] image to [0,255] (uint8 images are already in that range)"""
+    return image if image.dtype == np.uint8 else image * 255
+
+
 class Texture:
     """
     Initialize a texture buffer
@@ -83,7 +88,7 @@ class Texture:
             if len(image.shape) == 2:
                 image = np.stack([image] * 3, axis=2)
         # Return image
-        return image * 255
+        return to255(image)
 
     def _create(self, data):
         """Create a texture buffer from data"""
@@ -93,11 +98,11 @@ class Texture:
             w, h = data[:2]
         # If it's a tensor, convert to numpy
         elif is_tensor(data):
-            image = data.detach().cpu().numpy().transpose(1, 2, 0) * 255
+            image = to255(data.detach().cpu().numpy().transpose(1, 2, 0))
             h, w = data.shape[-2:]
         # Otherwise, it contains data and dimensions
         else:
-            image = data * 255
+            image = to255(data)
             h, w = data.shape[:2]
         # Store dimensions
         self.wh = (int(w), int(h))
@@ -137,6 +142,12 @@ class Texture:
         glTexParameterf(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER , GL_NEAREST)
         glTexParameterf(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER , GL_NEAREST)
 
+    def delete(self):
+        """Release texture memory (the texture cannot be used afterwards)"""
+        if self.id is not None:
+            glDeleteTextures([self.id])
+            self.id, self.wh = None, None
+
     @staticmethod
     def unbind():
         """Unbind texture buffer"""
@@ -0,0 +1,182 @@
+# Copyright 2023 Toyota Research Institute.  All rights reserved.
+
+import ctypes
+import os
+
+import OpenGL.GLUT as glut
+import pygame
+from OpenGL.GL import glFinish, GL_UNSIGNED_BYTE
+from pygame.locals import DOUBLEBUF, OPENGL
+
+from camviz.containers.framebuffer import Framebuffer
+
+
+class PygameBackend:
+    """
+    Window backend using pygame for display and input, and GLUT for text
+
+    Parameters
+    ----------
+    title : str
+        Window title
+    """
+    headless = False
+
+    def __init__(self, title=None):
+        # Initialize pygame display
+        pygame.init()
+        glut.glutInit()
+        # Initialize title
+        if title is not None:
+            pygame.display.set_caption(title)
+
+    def resize(self, wh):
+        """Create or resize window"""
+        pygame.display.set_mode(wh, DOUBLEBUF | OPENGL)
+
+    def swap(self):
+        """Display rendered frame"""
+        pygame.display.flip()
+
+    def makeCurrent(self):
+        """Make the window context current (pygame only supports a single window)"""
+        pass
+
+    def close(self):
+        """Close the window, destroying its context"""
+        pygame.display.quit()
+
+
+class OffscreenBackend:
+    """
+    Headless backend rendering to a framebuffer object, using an EGL or OSMesa context
+
+    PyOpenGL selects its platform when first imported, so PYOPENGL_PLATFORM must be set to
+    'egl' or 'osmesa' before importing camviz (e.g. PYOPENGL_PLATFORM=egl python script.py).
+    Text rendering is not available, since it relies on GLUT.
+
+    Parameters
+    ----------
+    platform : str
+        Context platform ['egl', 'osmesa']
+    """
+    headless = True
+
+    def __init__(self, platform='egl'):
+        assert platform in ['egl', 'osmesa'], 'Invalid offscreen platform'
+        if os.environ.get('PYOPENGL_PLATFORM') != platform:
+            raise RuntimeError('PYOPENGL_PLATFORM=%s must be set before importing camviz' % platform)
+        self.platform, self.fbo, self.buffer = platform, None, None
+        if platform == 'egl':
+            self._createEGL()
+        else:
+            self._createOSMesa((1, 1))
+
+    def _createEGL(self):
+        """Create an EGL context with a small pbuffer surface (rendering goes to a framebuffer object)"""
+        from OpenGL import EGL
+        # Without a display server, use Mesa's surfaceless platform
+        if 'DISPLAY' not in os.environ and 'WAYLAND_DISPLAY' not in os.environ:
+            os.environ.setdefault('EGL_PLATFORM', 'surfaceless')
+        self.display = EGL.eglGetDisplay(EGL.EGL_DEFAULT_DISPLAY)
+        major, minor = EGL.EGLint(), EGL.EGLint()
+        if not EGL.eglInitialize(self.display, ctypes.pointer(major), ctypes.pointer(minor)):
+            raise RuntimeError('Unable to initialize EGL display')
+        attribs = [EGL.EGL_SURFACE_TYPE, EGL.EGL_PBUFFER_BIT,
+                   EGL.EGL_RED_SIZE, 8, EGL.EGL_GREEN_SIZE, 8, EGL.EGL_BLUE_SIZE, 8,
+                   EGL.EGL_DEPTH_SIZE, 24, EGL.EGL_RENDERABLE_TYPE, EGL.EGL_OPENGL_BIT, EGL.EGL_NONE]
+        attribs = (EGL.EGLint * len(attribs))(*attribs)
+        config, num = EGL.EGLConfig(), EGL.EGLint()
+        if not EGL.eglChooseConfig(self.display, attribs, ctypes.pointer(config), 1, ctypes.pointer(num)) \
+                or num.value == 0:
+            raise RuntimeError('No suitable EGL configuration')
+        surface = [EGL.EGL_WIDTH, 1, EGL.EGL_HEIGHT, 1, EGL.EGL_NONE]
+        self.surface = EGL.eglCreatePbufferSurface(
+            self.display, config, (EGL.EGLint * len(surface))(*surface))
+        EGL.eglBindAPI(EGL.EGL_OPENGL_API)
+        self.context = EGL.eglCreateContext(self.display, config, EGL.EGL_NO_CONTEXT, None)
+        if not EGL.eglMakeCurrent(self.display, self.surface, self.surface, self.context):
+            raise RuntimeError('Unable to make EGL context current')
+
+    def _createOSMesa(self, wh):
+        """Create an OSMesa context rendering to a host buffer"""
+        from OpenGL import osmesa
+        self.context = osmesa.OSMesaCreateContextExt(osmesa.OSMESA_RGBA, 24, 0, 0, None)
+        if not self.context:
+            raise RuntimeError('Unable to create OSMesa context')
+        self._makeCurrentOSMesa(wh)
+
+    def _makeCurrentOSMesa(self, wh):
+        """Bind the OSMesa context to a host buffer of a given size"""
+        from OpenGL import osmesa, arrays
+        self.buffer = arrays.GLubyteArray.zeros((wh[1], wh[0], 4))
+        if not osmesa.OSMesaMakeCurrent(self.context, self.buffer, GL_UNSIGNED_BYTE, wh[0], wh[1]):
+            raise RuntimeError('Unable to make OSMesa context current')
+
+    def resize(self, wh):
+        """Create or resize the offscreen framebuffer, and bind it for drawing and reading"""
+        # OSMesa contexts need a host buffer at least as large as the viewport
+        if self.platform == 'osmesa':
+            self._makeCurrentOSMesa(wh)
+        if self.fbo is None:
+            self.fbo = Framebuffer(wh)
+        else:
+            self.fbo.release()
+            self.fbo.resize(wh)
+        self.fbo.bind()
+
+    def swap(self):
+        """Finish rendering the frame"""
+        glFinish()
+
+    def makeCurrent(self):
+        """Make the offscreen context current (e.g. when using several draw instances)"""
+        if self.platform == 'egl':
+            from OpenGL import EGL
+            EGL.eglMakeCurrent(self.display, self.surface, self.surface, self.context)
+        else:
+            from OpenGL import osmesa
+            osmesa.OSMesaMakeCurrent(self.context, self.buffer, GL_UNSIGNED_BYTE,
+                                     self.buffer.shape[1], self.buffer.shape[0])
+        if self.fbo is not None:
+            self.fbo.bind()
+
+    def close(self):
+        """Release the offscreen framebuffer and destroy the context"""
+        if self.fbo is not None:
+            self.fbo.release()
+            self.fbo.delete()
+            self.fbo = None
+        if self.platform == 'egl':
+            from OpenGL import EGL
+            EGL.eglMakeCurrent(self.display, EGL.EGL_NO_SURFACE, EGL.EGL_NO_SURFACE, EGL.EGL_NO_CONTEXT)
+            EGL.eglDestroySurface(self.display, self.surface)
+            EGL.eglDestroyContext(self.display, self.context)
+        else:
+            from OpenGL import osmesa
+            osmesa.OSMesaDestroyContext(self.context)
+        self.context = None
+
+
+def create_backend(backend='pygame', title=None):
+    """
+    Create a draw backend
+
+    Parameters
+    ----------
+    backend : str
+        Backend name ['pygame', 'egl', 'osmesa']
+    title : str
+        Window title (pygame only)
+
+    Returns
+    -------
+    backend : PygameBackend or OffscreenBackend
+        Created backend
+    """
+    if backend == 'pygame':
+        return PygameBackend(title)
+    elif backend in ['egl', 'osmesa']:
+        return OffscreenBackend(backend)
+    else:
+        raise ValueError('Invalid draw backend')
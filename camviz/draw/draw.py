@@ -1,31 +1,39 @@
 # Copyright 2023 Toyota Research Institute.  All rights reserved.
 
+import ctypes
 import time
 
-import OpenGL.GLUT as glut
 import numpy as np
-import pygame
 from OpenGL.GL import glReadPixels, glViewport, glScissor, \
-    glClear, glClearColor, glPixelStorei, \
-    GL_BGR, GL_UNSIGNED_BYTE, GL_COLOR_BUFFER_BIT, GL_DEPTH_BUFFER_BIT, \
-    GL_PACK_ALIGNMENT, GL_RGBA
-from PIL import Image, ImageOps
+    glClear, glClearColor, glPixelStorei, glMatrixMode, glLoadIdentity, glDisable, glEnable, \
+    glBindTexture, glBegin, glEnd, glTexCoord2f, glVertex2f, \
+    GL_RGB, GL_BGR, GL_RGBA, GL_BGRA, GL_DEPTH_COMPONENT, GL_UNSIGNED_BYTE, GL_FLOAT, \
+    GL_COLOR_BUFFER_BIT, GL_DEPTH_BUFFER_BIT, GL_PACK_ALIGNMENT, \
+    GL_PROJECTION, GL_MODELVIEW, GL_DEPTH_TEST, GL_BLEND, GL_TEXTURE_2D, GL_QUADS
+from OpenGL.GLU import gluOrtho2D
+from PIL import Image
+from camviz.containers.framebuffer import Framebuffer
+from camviz.draw.backend import create_backend
 from camviz.draw.draw_buffer import drawBuffer
 from camviz.draw.draw_input import DrawInput
+from camviz.draw.draw_record import DrawRecord
 from camviz.draw.draw_texture import DrawTexture
 from camviz.objects.camera import Camera
-from camviz.opengl.opengl_colors import setColor
+from camviz.opengl.opengl_colors import setColor, White
+from camviz.opengl.opengl_shaders import ShaderCache
 from camviz.opengl.opengl_shapes import setPointSize, setLineWidth
 from camviz.screen.screen2Dimage import Screen2Dimage
 from camviz.screen.screen3Dworld import Screen3Dworld
 from camviz.utils.types import is_tuple, is_list
 from camviz.utils.utils import labelrc
-from pygame.locals import *
 
+# Pixel formats for color readback
+READ_FORMATS = {'rgb': GL_RGB, 'bgr': GL_BGR, 'rgba': GL_RGBA, 'bgra': GL_BGRA}
 
-class Draw(DrawInput, DrawTexture, drawBuffer):
 
-    def __init__(self, wh=(1600, 900), rc=None, title=None, scale=1.0, width=1600):
+class Draw(DrawInput, DrawTexture, DrawRecord, drawBuffer):
+
+    def __init__(self, wh=(1600, 900), rc=None, title=None, scale=1.0, width=1600, backend='pygame'):
         """
         Draw class for display visualization
 
@@ -39,21 +47,23 @@ class Draw(DrawInput, DrawTexture, drawBuffer):
             Window title
         scale : float
             Scale for width/height window dimensions
+        width : int
+            Window width (height is adjusted to keep the aspect ratio)
+        backend : str
+            Draw backend ['pygame' for a window, 'egl' or 'osmesa' for headless rendering]
+            Headless backends require PYOPENGL_PLATFORM to be set before importing camviz
         """
         super().__init__()
-        # Initialize pygame display
-        pygame.init()
-        glut.glutInit()
-        # Initialize title
-        if title is not None:
-            pygame.display.set_caption(title)
+        # Initialize display backend
+        self.backend = create_backend(backend, title)
         # Initialize parameters
         wh = [int(val * scale) for val in wh]
         if width is not None:
             wh[0], wh[1] = width, width * wh[1] // wh[0]
         self.wh = self.curr_color = self.curr_size = self.curr_width = None
         self.screens, self.textures, self.buffers = {}, {}, {}
-        self.idx_screen = None
+        self.shaders = ShaderCache()
+        self.idx_screen = self.recorder = self.bound = None
         # Set size and color
         self.setSize(wh, rc)
         self.color('whi').size(1).width(1)
@@ -66,7 +76,29 @@ class Draw(DrawInput, DrawTexture, drawBuffer):
         # Store dimensions
         self.wh = wh
         # Initialize display
-        pygame.display.set_mode(self.wh, DOUBLEBUF|OPENGL)
+        self.backend.resize(self.wh)
+
+    def makeCurrent(self):
+        """Make the draw context current (when using several headless draw instances)"""
+        self.backend.makeCurrent()
+        return self
+
+    def close(self):
+        """Stop recording, release all OpenGL objects of the draw instance and destroy its context"""
+        self.stopRecording()
+        self.makeCurrent()
+        self.release()
+        self.shaders.delete()
+        for buffer in self.buffers.values():
+            buffer.delete()
+        for texture in self.textures.values():
+            texture.delete()
+        for screen in self.screens.values():
+            if screen.fbo is not None:
+                screen.fbo.delete()
+                screen.fbo = None
+        self.buffers, self.textures = {}, {}
+        self.backend.close()
 
     def __getitem__(self, name):
         """Get screen from name"""
@@ -88,13 +120,67 @@ class Draw(DrawInput, DrawTexture, drawBuffer):
         """Display object on screen"""
         obj.display(self, *args, **kwargs)
 
+    def render(self):
+        """Render the retained scenes of all 3D world screens"""
+        for name, screen in self.screens.items():
+            if isinstance(screen, Screen3Dworld) and len(screen.scene.children) > 0:
+                self.screen(name)
+                screen.render(self)
+        return self
+
+    def viewport(self, screen=None):
+        """Return the viewport (left, bottom, width, height) of a screen, or of the whole window"""
+        if screen is None:
+            return 0, 0, self.wh[0], self.wh[1]
+        l, u, w, h = self.screens[screen].luwh
+        return l, self.wh[1] - (h + u), w, h
+
+    def read(self, out=None, screen=None, depth=False, channels='rgb', flip=True):
+        """
+        Read pixels from the window (or from one screen) into a numpy array
+
+        Parameters
+        ----------
+        out : np.array [H,W,C] or [H,W]
+            Array to be filled (uint8 for color, float32 for depth), allocated if not provided.
+            Arrays returned by previous reads can be passed back to avoid allocations
+        screen : str
+            Screen to be read (if None, read the whole window)
+        depth : bool
+            If true, read the depth buffer as float32 values in [0,1]
+        channels : str
+            Color channel order ['rgb', 'bgr', 'rgba', 'bgra']
+        flip : bool
+            If true, return a vertically flipped view (first row on top) instead of OpenGL's
+            bottom-up row order. No data is copied either way
+
+        Returns
+        -------
+        data : np.array [H,W,C] or [H,W]
+            Pixel data (a view of out)
+        """
+        x, y, w, h = self.viewport(screen)
+        # Get format, type and shape
+        if depth:
+            fmt, gltype, dtype, shape = GL_DEPTH_COMPONENT, GL_FLOAT, np.float32, (h, w)
+        else:
+            fmt, gltype, dtype = READ_FORMATS[channels], GL_UNSIGNED_BYTE, np.uint8
+            shape = (h, w, len(channels))
+        # Allocate or validate output array (flipped views are read into their base order)
+        if out is None:
+            out = np.empty(shape, dtype=dtype)
+        elif out.ndim > 0 and out.strides[0] < 0:
+            out = out[::-1]
+        assert out.shape == shape and out.dtype == dtype and out.flags['C_CONTIGUOUS'], \
+            'Invalid output array (expected contiguous %s with shape %s)' % (np.dtype(dtype).name, shape)
+        # Read pixels directly into the output array
+        glPixelStorei(GL_PACK_ALIGNMENT, 1)
+        glReadPixels(x, y, w, h, fmt, gltype, ctypes.c_void_p(out.ctypes.data))
+        return out[::-1] if flip else out
+
     def to_image(self):
-        """Convert window into a numpy image"""
-        x, y, w, h = 0, 0, self.wh[0], self.wh[1]
-        data = glReadPixels(x, y, w, h, GL_BGR, GL_UNSIGNED_BYTE)
-        image = Image.frombytes("RGB", (w, h), data)
-        image = image.transpose(Image.FLIP_TOP_BOTTOM)
-        return np.asarray(image)
+        """Convert window into a numpy image (BGR)"""
+        return np.ascontiguousarray(self.read(channels='bgr'))
 
     def currScreen(self):
         """Return current screen"""
@@ -132,22 +218,77 @@ class Draw(DrawInput, DrawTexture, drawBuffer):
 
     def screen(self, name):
         """Set which screen will be used for drawing"""
+        self.release()
         self.idx_screen = name
-        # Get parameters
-        d = self.wh[1]
-        l, u, w, h = self.currScreen().luwh
-        u = d - (h + u)
+        screen = self.currScreen()
+        # Cached screens are drawn into their own framebuffer
+        if screen.cache:
+            l, u, w, h = 0, 0, screen.luwh[2], screen.luwh[3]
+            if screen.fbo is None:
+                screen.fbo = Framebuffer((w, h), texture=True)
+            else:
+                screen.fbo.resize((w, h))
+            self.bound = screen.fbo.bind()
+        # Otherwise, draw directly on the window
+        else:
+            l, u, w, h = self.viewport(name)
         # Create viewport and cropping
         glViewport(l, u, w, h)
         glScissor(l, u, w, h)
         # Set background color
         glClearColor(0.0, 0.0, 0.0, 1.0)
         # glClearColor(1.0, 1.0, 1.0, 1.0)
+        # Clear cached screens the first time they are drawn in a frame
+        if screen.cache and not screen.drawn:
+            glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+            screen.drawn = True
+            screen.uses.clear()
         # Prepare current screen
-        self.currScreen().prepare()
+        screen.prepare()
         return self
 
-    def add2Dimage(self, name, luwh, res=None):
+    def release(self):
+        """Stop drawing on a cached screen framebuffer, returning to the window"""
+        if self.bound is not None:
+            self.bound.release()
+            self.bound = None
+
+    def composite(self):
+        """Draw cached screen textures on the window"""
+        self.release()
+        screens = {name: screen for name, screen in self.screens.items()
+                   if screen.cache and screen.fbo is not None}
+        if len(screens) == 0:
+            return
+        # Set up a unit orthographic projection
+        glMatrixMode(GL_PROJECTION)
+        glLoadIdentity()
+        gluOrtho2D(0.0, 1.0, 0.0, 1.0)
+        glMatrixMode(GL_MODELVIEW)
+        glLoadIdentity()
+        glDisable(GL_DEPTH_TEST)
+        glDisable(GL_BLEND)
+        glEnable(GL_TEXTURE_2D)
+        White()
+        # Draw each screen texture on its viewport
+        for name, screen in screens.items():
+            l, u, w, h = self.viewport(name)
+            glViewport(l, u, w, h)
+            glScissor(l, u, w, h)
+            glBindTexture(GL_TEXTURE_2D, screen.fbo.color)
+            glBegin(GL_QUADS)
+            for x, y in [(0.0, 0.0), (1.0, 0.0), (1.0, 1.0), (0.0, 1.0)]:
+                glTexCoord2f(x, y)
+                glVertex2f(x, y)
+            glEnd()
+            # Screens drawn in this frame are now up to date
+            if screen.drawn:
+                screen.validate()
+                screen.drawn = False
+        glBindTexture(GL_TEXTURE_2D, 0)
+        glDisable(GL_TEXTURE_2D)
+
+    def add2Dimage(self, name, luwh, res=None, cache=False):
         """
         Add 2D image screen
 
@@ -159,6 +300,8 @@ class Draw(DrawInput, DrawTexture, drawBuffer):
             Screen dimensions (pixels or percentage)
         res : tuple (width, height)
             Screen resolution
+        cache : bool
+            If true, render screens into cached framebuffer textures
         """
         # If name is a tuple, create labels for rows and columns
         if is_tuple(name):
@@ -174,12 +317,12 @@ class Draw(DrawInput, DrawTexture, drawBuffer):
                     d = (luwh[2] - luwh[0]) / len(name[i])
                     luwh_i[0] = luwh[0] + j * d
                     luwh_i[2] = luwh_i[0] + d
-                    self.add2Dimage(name[i][j], luwh_i, res)
+                    self.add2Dimage(name[i][j], luwh_i, res, cache)
         # Else, create a single screen
         else:
-            self.screens[name] = Screen2Dimage(self.addScreen(luwh), res)
+            self.screens[name] = Screen2Dimage(self.addScreen(luwh), res, cache)
 
-    def add2DimageRow(self, name, luwh, n, res=None):
+    def add2DimageRow(self, name, luwh, n, res=None, cache=False):
         """
         Add row with multiple 2D image screens
 
@@ -193,6 +336,8 @@ class Draw(DrawInput, DrawTexture, drawBuffer):
             Number of columns in the row
         res : tuple (width, height)
             Screen resolution
+        cache : bool
+            If true, render screens into cached framebuffer textures
         """
         for i in range(n):
             # Copy dimension vector
@@ -201,9 +346,9 @@ class Draw(DrawInput, DrawTexture, drawBuffer):
             luwh_i[0] = luwh[0] + (i / n) * (luwh[2] - luwh[0])
             luwh_i[2] = luwh[0] + ((i + 1) / n) * (luwh[2] - luwh[0])
             # Create 2D image screen
-            self.add2Dimage('%s%d' % (name, i), luwh_i, res)
+            self.add2Dimage('%s%d' % (name, i), luwh_i, res, cache)
 
-    def add2DimageCol(self, name, luwh, n, res=None):
+    def add2DimageCol(self, name, luwh, n, res=None, cache=False):
         """
         Add column with multiple 2D image screens
 
@@ -217,6 +362,8 @@ class Draw(DrawInput, DrawTexture, drawBuffer):
             Number of rows in the column
         res : tuple (width, height)
             Screen resolution
+        cache : bool
+            If true, render screens into cached framebuffer textures
         """
         for i in range(n):
             # Copy dimension vector
@@ -225,9 +372,9 @@ class Draw(DrawInput, DrawTexture, drawBuffer):
             luwh_i[1] = luwh[1] + (i / n) * (luwh[3] - luwh[1])
             luwh_i[3] = luwh[1] + ((i + 1) / n) * (luwh[3] - luwh[1])
             # Create 2D image screen
-            self.add2Dimage('%s%d' % (name, i), luwh_i, res)
+            self.add2Dimage('%s%d' % (name, i), luwh_i, res, cache)
 
-    def add2DimageGrid(self, name, luwh, n, res=None):
+    def add2DimageGrid(self, name, luwh, n, res=None, cache=False):
         """
         Add grid with multiple 2D image screens
 
@@ -241,6 +388,8 @@ class Draw(DrawInput, DrawTexture, drawBuffer):
             Number of rows and columns in the grid
         res : tuple (width, height)
             Screen resolution
+        cache : bool
+            If true, render screens into cached framebuffer textures
         """
         for i in range(n[0]):
             for j in range(n[1]):
@@ -253,7 +402,7 @@ class Draw(DrawInput, DrawTexture, drawBuffer):
                 luwh_i[0] = luwh[0] + (j / n[1]) * (luwh[2] - luwh[0])
                 luwh_i[2] = luwh[0] + ((j + 1) / n[1]) * (luwh[2] - luwh[0])
                 # Create 2D image screen
-                self.add2Dimage('%s%d%d' % (name, i, j), luwh_i, res)
+                self.add2Dimage('%s%d%d' % (name, i, j), luwh_i, res, cache)
 
     def add3Dworld(self, name, luwh=(0.0, 0.0, 1.0, 1.0), **kwargs):
         """
@@ -265,6 +414,8 @@ class Draw(DrawInput, DrawTexture, drawBuffer):
             Screen name
         luwh : tuple
             Screen dimensions (left, up, width, height), in pixels or percentage
+        kwargs : kwargs
+            Screen3Dworld arguments (e.g. cache=True to render into a cached framebuffer texture)
         """
         # If name is a tuple, create labels for rows and columns
         if is_tuple(name):
@@ -284,6 +435,7 @@ class Draw(DrawInput, DrawTexture, drawBuffer):
         # Else, create a single screen
         else:
             self.screens[name] = Screen3Dworld(self.addScreen(luwh), **kwargs)
+            self.screens[name].draw_ref = self
 
     @staticmethod
     def clear():
@@ -340,21 +492,14 @@ class Draw(DrawInput, DrawTexture, drawBuffer):
         """Stop for n milliseconds"""
         time.sleep(n/1000)
 
-    def save(self, filename):
-        """Save window as an image file"""
-        # Get dimensions
-        width, height = self.wh
-        # Store window information in a variable
-        glPixelStorei(GL_PACK_ALIGNMENT, 1)
-        data = glReadPixels(0, 0, width, height, GL_RGBA, GL_UNSIGNED_BYTE)
-        image = Image.frombytes("RGBA", (width, height), data)
-        image = ImageOps.flip(image)  # in my case image is flipped top-bottom for some reason
-        # Save image and halt for a bit
-        image.save(filename, 'PNG')
-        self.halt(1000)
+    def save(self, filename, screen=None):
+        """Save window (or one screen) as an image file"""
+        Image.fromarray(self.read(screen=screen, channels='rgba')).save(filename)
 
     def cvcam(self, cam, *args, **kwargs):
         return Camera.from_vidar(cam, *args, **kwargs)
 
     def text(self, string, wh):
+        if self.backend.headless:
+            raise RuntimeError('Text rendering is not available with headless backends')
         return self.currScreen().text(string, wh)
@@ -1,15 +1,20 @@
 # Copyright 2023 Toyota Research Institute.  All rights reserved.
 
+import ctypes
+
 import numpy as np
 from OpenGL.GL import glEnableClientState, glDisableClientState, \
-    glPolygonMode, glVertexPointer, glBindBuffer, glColorPointer, \
+    glPolygonMode, glVertexPointer, glBindBuffer, glColorPointer, glNormalPointer, \
+    glIsEnabled, glEnable, glDisable, GL_LIGHTING, GL_NORMAL_ARRAY, \
+    glEnableVertexAttribArray, glDisableVertexAttribArray, glVertexAttribPointer, \
     glDrawArrays, glDrawElements, glBegin, glEnd, glVertex2fv, glVertex3fv, \
     GL_ARRAY_BUFFER, GL_FILL, GL_ELEMENT_ARRAY_BUFFER, \
-    GL_FLOAT, GL_UNSIGNED_INT, GL_POINTS, GL_FRONT_AND_BACK, GL_COLOR_ARRAY, \
+    GL_FLOAT, GL_FALSE, GL_UNSIGNED_INT, GL_UNSIGNED_BYTE, GL_POINTS, GL_FRONT_AND_BACK, GL_COLOR_ARRAY, \
     GL_VERTEX_ARRAY, GL_LINE, GL_LINES, GL_LINE_LOOP, GL_LINE_STRIP, GL_QUADS, GL_TRIANGLES
 
 from camviz.containers.buffer import Buffer
 from camviz.opengl.opengl_shapes import drawConnects, drawMatches, drawAxis, drawEllipse
+from camviz.opengl.opengl_shaders import useColormap, releaseColormap
 from camviz.utils.utils import grid_idx
 from camviz.utils.types import is_str, is_list, is_tuple, is_int
 from camviz.utils.cmaps import jet
@@ -20,7 +25,7 @@ class drawBuffer:
     def __init__(self):
         pass
 
-    def addBuffer(self, name, data, dtype, gltype, n=None):
+    def addBuffer(self, name, data, dtype, gltype, n=None, attr=False):
         """
         Create a new data buffer
 
@@ -37,22 +42,31 @@ class drawBuffer:
             OpenGL data type
         n : int or tuple
             Number of textures to be added
+        attr : bool
+            If true, the buffer stores scalar attribute channels
         """
         # If it's a list, create one buffer for each item
         if is_list(name):
             for i in range(len(name)):
-                self.addBuffer(name[i], data[i] if is_list(data) else data, dtype, gltype)
+                self.addBuffer(name[i], data[i] if is_list(data) else data, dtype, gltype, attr=attr)
         # Otherwise, create a single buffer
         else:
             if n is not None:
                 if is_tuple(n):
                     for i in range(n[0]):
                         for j in range(n[1]):
-                            self.buffers['%s%d%d' % (name, i, j)] = Buffer(data, dtype, gltype)
+                            self.buffers['%s%d%d' % (name, i, j)] = Buffer(data, dtype, gltype, attr)
                 elif is_int(n):
                     for i in range(n):
-                        self.buffers['%s%d' % (name, i)] = Buffer(data, dtype, gltype)
-            self.buffers[name] = Buffer(data, dtype, gltype)
+                        self.buffers['%s%d' % (name, i)] = Buffer(data, dtype, gltype, attr)
+            self.buffers[name] = Buffer(data, dtype, gltype, attr)
+
+    def newBufferName(self, prefix='buffer'):
+        """Return a buffer name starting with prefix that is not in use yet"""
+        i = 0
+        while '%s%d' % (prefix, i) in self.buffers:
+            i += 1
+        return '%s%d' % (prefix, i)
 
     def addBufferf(self, name, data=0):
         """Create a buffer with float32 values (2D or 3D is determined from data)"""
@@ -62,6 +76,10 @@ class drawBuffer:
         """Create a buffer with unsigned 32 values (2D or 3D is determined from data)"""
         self.addBuffer(name, data, np.uint32, GL_UNSIGNED_INT)
 
+    def addBufferb(self, name, data=0):
+        """Create a buffer with unsigned 8 values (e.g. colors in [0,255])"""
+        self.addBuffer(name, data, np.uint8, GL_UNSIGNED_BYTE)
+
     def addBuffer2f(self, name, data=0, n=None):
         """Create a 2D empty buffer with float32 values"""
         self.addBuffer(name, (data, 2), np.float32, GL_FLOAT, n)
@@ -74,17 +92,26 @@ class drawBuffer:
         """Create an index buffer for shape drawing"""
         self.addBufferu(name, grid_idx(data))
 
-    def addBufferJET(self, name, data=0):
-        """Create a JET colormap buffer from data"""
-        self.addBufferf(name, jet(data))
+    def addBufferAttr(self, name, data=0):
+        """Create a buffer with float32 scalar attributes [N] or [N,C], colormapped when drawing"""
+        self.addBuffer(name, data, np.float32, GL_FLOAT, attr=True)
+
+    def addBufferJET(self, name, data=0, range=None):
+        """Create a JET colormap buffer from data (range can be fixed or a RangeEstimator)"""
+        self.addBufferf(name, jet(data, range=range))
 
     def addBuffer3JET(self, name, data=0):
         """Create an empty 3D colormap buffer from data"""
         self.addBuffer3f(name, data)
 
     def updBufferf(self, name, data):
-        """Update a buffer with float32 values"""
+        """Update a buffer with float32 values (requesting a redraw)"""
         self.buffers[name].update(data)
+        self.invalidate(name)
+
+    def delBuffer(self, name):
+        """Delete a buffer and release its memory"""
+        self.buffers.pop(name).delete()
 
     def clrBuffer(self, name):
         """Clear a buffer"""
@@ -158,7 +185,8 @@ class drawBuffer:
         else:
             return self._drawBase(shape, *args, **kwargs)
 
-    def _drawBuffer(self, shape, vert, color=None, idx=None, wire=None):
+    def _drawBuffer(self, shape, vert, color=None, idx=None, wire=None,
+                    cmap=None, range=None, channel=0, alpha=1.0, normal=None, exp=1.0):
         """
         Draw from a buffer
 
@@ -169,11 +197,24 @@ class drawBuffer:
         vert : buffer
             Buffer with vertices
         color : buffer
-            Buffer with colors
+            Buffer with colors, or with scalar attributes to be colormapped
         idx : buffer
             Buffer with indexes
         wire : buffer
             Buffer with wire (color and width)
+        cmap : str
+            Colormap for scalar attributes (defaults to 'jet' for attribute buffers)
+        range : tuple (min,max) or RangeEstimator
+            Colormap range (if None, use the attribute channel range).
+            Estimators are not updated here, and use the channel range until they have an estimate
+        channel : int
+            Attribute channel to be colormapped
+        alpha : float
+            Colormap transparency
+        normal : buffer
+            Buffer with normals (used for lighting)
+        exp : float
+            Colormap exponential weight
         """
         # If wire is avaialble
         if wire is not None:
@@ -182,10 +223,18 @@ class drawBuffer:
             color_wire = wire[0] if wire[0] in self.buffers else None
             if wire[0] not in self.buffers:
                 self.color(wire[0])
+            # Wires are not lit
+            lighting = glIsEnabled(GL_LIGHTING)
+            if lighting:
+                glDisable(GL_LIGHTING)
             glPolygonMode(GL_FRONT_AND_BACK, GL_LINE)
             self._drawBuffer(shape, vert, color=color_wire, idx=idx, wire=None)
             glPolygonMode(GL_FRONT_AND_BACK, GL_FILL)
+            if lighting:
+                glEnable(GL_LIGHTING)
             self.setCSW(csw)
+        # Record buffers used by the current screen
+        self.currScreen().use(vert, color, idx, normal)
         # If vert is available
         if vert is not None:
             if vert not in self.buffers.keys():
@@ -194,26 +243,51 @@ class drawBuffer:
             glEnableClientState(GL_VERTEX_ARRAY)
             glBindBuffer(GL_ARRAY_BUFFER, vert.id)
             glVertexPointer(vert.d, vert.gltype, 0, None)
+        # If normal is available
+        if normal is not None:
+            normal = self.buffers[normal]
+            glEnableClientState(GL_NORMAL_ARRAY)
+            glBindBuffer(GL_ARRAY_BUFFER, normal.id)
+            glNormalPointer(normal.gltype, 0, None)
         # If color is available
+        attr = None
         if color is not None and color in self.buffers:
             color = self.buffers[color]
-            glEnableClientState(GL_COLOR_ARRAY)
-            glBindBuffer(GL_ARRAY_BUFFER, color.id)
-            glColorPointer(color.d, color.gltype, 0, None)
+            # If it stores attributes, colormap them in a shader
+            if color.attr or cmap is not None:
+                lims = color.range(channel)
+                program = useColormap(self.shaders, 'jet' if cmap is None else cmap,
+                                      lims if range is None else range, alpha, exp=exp, default=lims)
+                attr = program.attribute('value')
+                size = np.dtype(color.dtype).itemsize
+                glEnableVertexAttribArray(attr)
+                glBindBuffer(GL_ARRAY_BUFFER, color.id)
+                glVertexAttribPointer(attr, 1, color.gltype, GL_FALSE,
+                                      color.d * size, ctypes.c_void_p(channel * size))
+            # Otherwise, use it as colors
+            else:
+                glEnableClientState(GL_COLOR_ARRAY)
+                glBindBuffer(GL_ARRAY_BUFFER, color.id)
+                glColorPointer(color.d, color.gltype, 0, None)
         # If idx is available
         if idx is None:
             glDrawArrays(shape, 0, vert.n)
         else:
             idx = self.buffers[idx]
             glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, idx.id)
-            glDrawElements(shape, 3 * idx.n, idx.gltype, None)
+            glDrawElements(shape, idx.n * idx.d, idx.gltype, None)
         # Bind buffers
         glBindBuffer(GL_ARRAY_BUFFER, 0)
-        # Unbind vertices
+        # Unbind vertices and normals
         if vert is not None:
             glDisableClientState(GL_VERTEX_ARRAY)
-        # Unbind colors
-        if color is not None:
+        if normal is not None:
+            glDisableClientState(GL_NORMAL_ARRAY)
+        # Unbind colors or attributes
+        if attr is not None:
+            glDisableVertexAttribArray(attr)
+            releaseColormap()
+        elif color is not None:
             glDisableClientState(GL_COLOR_ARRAY)
         # Return self
         return self
@@ -1,5 +1,7 @@
 # Copyright 2023 Toyota Research Institute.  All rights reserved.
 
+import time
+
 import pygame
 
 
@@ -21,6 +23,8 @@ class DrawInput:
         self.mouse_pos = self.motion_type = None
         self.tmp_screen, self.tmp_focus = None, False
         self.mouse_down = False
+        # Initialize render loop
+        self.callbacks, self.invalid, self.running, self.last_update = [], True, False, None
 
     def change_keys(self, key, flag):
         """
@@ -118,12 +122,21 @@ class DrawInput:
         if key == pygame.K_9:
             self.KEY_9 = flag
 
-    def input(self):
+    def input(self, events=None):
         """
         Parse keyboard and mouse input
+
+        Parameters
+        ----------
+        events : list
+            Events to be parsed (if None, get all events from the queue)
         """
-        events = pygame.event.get()     # Get events
-        pos = pygame.mouse.get_pos()    # Get mouse position
+        # Headless backends have no input
+        if self.backend.headless:
+            return True
+        if events is None:
+            events = pygame.event.get()     # Get events
+        pos = pygame.mouse.get_pos()        # Get mouse position
 
         # If mouse is not pressing down
         if self.mouse_down is False:
@@ -265,11 +278,136 @@ class DrawInput:
         # Continue and return True
         return True
 
-    @staticmethod
-    def update(wait):
-        """Update window after every wait milisseconds"""
-        pygame.display.flip()
-        pygame.time.wait(wait)
+    def update(self, wait):
+        """
+        Update window, waiting until wait milliseconds have passed since the previous update
+        (the time taken to render the frame is discounted, headless backends only finish rendering)
+        """
+        # Draw cached screens on the window
+        self.composite()
+        # Capture frame before it is swapped out, if recording
+        if self.recorder is not None:
+            self.recorder.capture()
+        if not self.backend.headless and self.last_update is not None:
+            remaining = wait - 1000.0 * (time.perf_counter() - self.last_update)
+            if remaining >= 1.0:
+                pygame.time.wait(int(remaining))
+        self.backend.swap()
+        self.last_update = time.perf_counter()
+
+    def invalidate(self, name=None):
+        """
+        Request a redraw from the render loop (can be called from other threads)
+
+        Parameters
+        ----------
+        name : str or Screen
+            Texture or buffer that changed (only cached screens that use it are redrawn),
+            or screen to be redrawn. If None, all cached screens are redrawn
+        """
+        for screen in self.screens.values():
+            if name is None or screen is name or name in screen.uses:
+                screen.invalidate()
+        if not self.invalid:
+            self.invalid = True
+            # Wake up the render loop if it is waiting for events
+            if not self.backend.headless and pygame.display.get_init():
+                pygame.event.post(pygame.event.Event(pygame.USEREVENT))
+
+    def callback(self, func=None, screen=None):
+        """
+        Register a draw callback, called as func(draw) whenever the window is redrawn.
+        The callback may return True to request another frame (e.g. for animations).
+        Can be used as a decorator (@draw.callback or @draw.callback(screen='name'))
+
+        Parameters
+        ----------
+        func : function
+            Draw callback
+        screen : str
+            Screen the callback draws on. It is selected before calling, and cached
+            screens only call their callbacks when they need to be rendered again
+        """
+        if func is None:
+            return lambda f: self.callback(f, screen)
+        if screen is None:
+            self.callbacks.append(func)
+        else:
+            self.screens[screen].callbacks.append(func)
+        self.invalidate(None if screen is None else self.screens[screen])
+        return func
+
+    def active(self):
+        """Return True if there is ongoing interaction (keys held down or mouse dragging)"""
+        if self.backend.headless:
+            return False
+        return self.mouse_down or any(pygame.key.get_pressed())
+
+    def run(self, fps=30, frames=None):
+        """
+        Event-driven render loop, redrawing registered callbacks only on input events,
+        data updates or invalidation, and blocking on the event queue otherwise
+
+        Parameters
+        ----------
+        fps : float
+            Maximum frame rate
+        frames : int
+            Maximum number of frames to be drawn (if None, run until the window is closed,
+            or in headless mode until there is nothing left to redraw)
+
+        Returns
+        -------
+        count : int
+            Number of frames drawn
+        """
+        period = 1000.0 / fps
+        self.running, count = True, 0
+        while self.running and (frames is None or count < frames):
+            # Get events, blocking until one arrives if there is nothing to redraw
+            if self.backend.headless:
+                # Without input there is nothing to wait for, so draw every frame or stop when up to date
+                if frames is None and not self.invalid:
+                    break
+                events, self.invalid = [], True
+            elif self.invalid or self.active():
+                events = pygame.event.get()
+            else:
+                events = [pygame.event.wait()] + pygame.event.get()
+            # Parse input and stop if requested
+            if not self.input(events):
+                break
+            # Mouse motion only matters while dragging
+            if any(event.type != pygame.MOUSEMOTION or self.mouse_down for event in events):
+                self.invalid = True
+            if not self.invalid and not self.active():
+                continue
+            # Redraw window (invalidations while drawing request another frame)
+            self.invalid = False
+            self.clear()
+            again, animated = False, []
+            for name, screen in self.screens.items():
+                if len(screen.callbacks) > 0 and (not screen.cache or screen.changed()):
+                    self.screen(name)
+                    redraw = False
+                    for func in screen.callbacks:
+                        redraw = func(self) is True or redraw
+                    if redraw:
+                        animated.append(screen)
+                    again = again or redraw
+            for func in self.callbacks:
+                again = func(self) is True or again
+            self.update(period)
+            # Screens that requested another frame must be drawn again, even if cached
+            for screen in animated:
+                screen.invalidate()
+            self.invalid, count = self.invalid or again, count + 1
+        self.running = False
+        return count
+
+    def stop(self):
+        """Stop the render loop after the current frame"""
+        self.running = False
 
     @staticmethod
     def control(obj):
@@ -0,0 +1,175 @@
+# Copyright 2023 Toyota Research Institute.  All rights reserved.
+
+import ctypes
+import os
+import queue
+import threading
+from collections import deque
+
+import cv2
+import numpy as np
+from OpenGL.GL import \
+    glGenBuffers, glDeleteBuffers, glBindBuffer, glBufferData, glMapBuffer, glUnmapBuffer, \
+    glReadPixels, glPixelStorei, \
+    GL_PIXEL_PACK_BUFFER, GL_STREAM_READ, GL_READ_ONLY, GL_PACK_ALIGNMENT, \
+    GL_RGB, GL_BGR, GL_UNSIGNED_BYTE
+from PIL import Image
+
+# File extensions encoded as videos (everything else is saved as individual frames)
+VIDEO_EXTENSIONS = ['.mp4', '.avi', '.mkv', '.mov']
+
+
+class Recorder:
+    """
+    Asynchronous frame recorder, reading frames through rotating pixel buffer objects (PBOs)
+    and writing them on background threads.
+
+    Each captured frame is read into a PBO without stalling, and only mapped once
+    all PBOs are in use (a few frames later), when the transfer is already finished.
+    Mapped frames are copied into preallocated arrays and handed to writer threads.
+
+    Parameters
+    ----------
+    wh : tuple (width, height)
+        Frame dimensions
+    filename : str
+        Output video (.mp4, .avi, .mkv, .mov), image pattern with a frame number
+        placeholder (e.g. frames/%06d.png), or folder where PNG frames are saved
+    fps : float
+        Video frame rate
+    n : int
+        Number of rotating PBOs (frames are written with a delay of n-1 captures)
+    pool : int
+        Number of preallocated frame arrays (capture blocks if writers fall this far behind)
+    workers : int
+        Number of image writer threads (videos always use a single writer)
+    codec : str
+        Video codec (FourCC)
+    """
+    def __init__(self, wh, filename, fps=30, n=3, pool=8, workers=2, codec='mp4v'):
+        self.wh = (int(wh[0]), int(wh[1]))
+        self.size = self.wh[0] * self.wh[1] * 3
+        self.count = 0
+        # Prepare output, videos are encoded in BGR and images saved in RGB
+        self.video = os.path.splitext(filename)[1].lower() in VIDEO_EXTENSIONS
+        if self.video:
+            self.format, workers = GL_BGR, 1
+            self.writer = cv2.VideoWriter(filename, cv2.VideoWriter_fourcc(*codec), fps, self.wh)
+            if not self.writer.isOpened():
+                raise RuntimeError('Unable to open video writer for %s' % filename)
+        else:
+            self.format, self.writer = GL_RGB, None
+            if '%' not in filename:
+                filename = os.path.join(filename, '%06d.png')
+            os.makedirs(os.path.dirname(filename) or '.', exist_ok=True)
+        self.filename = filename
+        # Create rotating PBOs
+        self.pbos = [glGenBuffers(1) for _ in range(n)]
+        for pbo in self.pbos:
+            glBindBuffer(GL_PIXEL_PACK_BUFFER, pbo)
+            glBufferData(GL_PIXEL_PACK_BUFFER, self.size, None, GL_STREAM_READ)
+        glBindBuffer(GL_PIXEL_PACK_BUFFER, 0)
+        self.pending = deque()
+        # Preallocate frames that are recycled by writer threads
+        self.free, self.queue = queue.Queue(), queue.Queue()
+        for _ in range(max(pool, 1)):
+            self.free.put(np.empty((self.wh[1], self.wh[0], 3), dtype=np.uint8))
+        # Start writer threads
+        self.threads = [threading.Thread(target=self._write, daemon=True) for _ in range(workers)]
+        for thread in self.threads:
+            thread.start()
+
+    def __len__(self):
+        """Return number of captured frames"""
+        return self.count
+
+    def capture(self):
+        """Start reading the current frame, and retrieve the oldest pending frame if all PBOs are in use"""
+        if len(self.pending) == len(self.pbos):
+            self._retrieve()
+        pbo = self.pbos[self.count % len(self.pbos)]
+        # Asynchronous read into the PBO (returns immediately)
+        glPixelStorei(GL_PACK_ALIGNMENT, 1)
+        glBindBuffer(GL_PIXEL_PACK_BUFFER, pbo)
+        glReadPixels(0, 0, self.wh[0], self.wh[1], self.format, GL_UNSIGNED_BYTE, ctypes.c_void_p(0))
+        glBindBuffer(GL_PIXEL_PACK_BUFFER, 0)
+        self.pending.append((pbo, self.count))
+        self.count += 1
+
+    def _retrieve(self):
+        """Copy the oldest pending PBO into a free frame and send it to the writers"""
+        pbo, idx = self.pending.popleft()
+        frame = self.free.get()
+        glBindBuffer(GL_PIXEL_PACK_BUFFER, pbo)
+        ptr = glMapBuffer(GL_PIXEL_PACK_BUFFER, GL_READ_ONLY)
+        ctypes.memmove(frame.ctypes.data, ptr, self.size)
+        glUnmapBuffer(GL_PIXEL_PACK_BUFFER)
+        glBindBuffer(GL_PIXEL_PACK_BUFFER, 0)
+        self.queue.put((idx, frame))
+
+    def _write(self):
+        """Writer thread, saving frames (flipped, since OpenGL rows start at the bottom)"""
+        flipped = np.empty((self.wh[1], self.wh[0], 3), dtype=np.uint8)
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            idx, frame = item
+            cv2.flip(frame, 0, dst=flipped)
+            self.free.put(frame)
+            if self.video:
+                self.writer.write(flipped)
+            else:
+                Image.fromarray(flipped).save(self.filename % idx)
+
+    def stop(self):
+        """Write pending frames, wait for writers to finish and release resources"""
+        while len(self.pending) > 0:
+            self._retrieve()
+        for _ in self.threads:
+            self.queue.put(None)
+        for thread in self.threads:
+            thread.join()
+        if self.writer is not None:
+            self.writer.release()
+        glDeleteBuffers(len(self.pbos), self.pbos)
+        return self.count
+
+
+class DrawRecord:
+    """Draw subclass containing recording methods"""
+    def record(self, filename, fps=30, n=3, pool=8, workers=2, codec='mp4v'):
+        """
+        Start recording, capturing the window every time it is updated
+
+        Parameters
+        ----------
+        filename : str
+            Output video (.mp4, .avi, .mkv, .mov), image pattern with a frame number
+            placeholder (e.g. frames/%06d.png), or folder where PNG frames are saved
+        fps : float
+            Video frame rate
+        n : int
+            Number of rotating pixel buffers
+        pool : int
+            Number of preallocated frames waiting to be written
+        workers : int
+            Number of image writer threads
+        codec : str
+            Video codec (FourCC)
+        """
+        self.stopRecording()
+        self.recorder = Recorder(self.wh, filename, fps=fps, n=n, pool=pool, workers=workers, codec=codec)
+        return self
+
+    def stopRecording(self):
+        """Stop recording, returning the number of recorded frames"""
+        if self.recorder is None:
+            return 0
+        count, self.recorder = self.recorder.stop(), None
+        return count
+
+    @property
+    def recording(self):
+        """Return True if the window is being recorded"""
+        return self.recorder is not None
@@ -45,8 +45,9 @@ class DrawTexture:
             self.textures[name] = Texture(data)
 
     def updTexture(self, name, data):
-        """Update texture with new data"""
+        """Update texture with new data (requesting a redraw)"""
         self.textures[name].update(data)
+        self.invalidate(name)
 
     def image(self, name, data=None, verts=None, fit=False):
         """
@@ -68,6 +69,7 @@ class DrawTexture:
             return
         # Get texture ID from name
         tex = self.textures[name]
+        self.currScreen().use(name)
         # Resize screen to fit screen if necessary
         if fit is True:
             self.currScreen().setRes(tex.wh)
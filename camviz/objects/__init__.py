@@ -1,3 +1,8 @@
 # Copyright 2023 Toyota Research Institute.  All rights reserved.
 
 from camviz.objects.camera import Camera
+from camviz.objects.camera_batch import CameraBatch
+from camviz.objects.depthcloud import DepthCloud
+from camviz.objects.mesh import Mesh
+from camviz.objects.pose_array import PoseArray
+from camviz.objects.trajectory import Trajectory
@@ -1,8 +1,11 @@
 # Copyright 2023 Toyota Research Institute.  All rights reserved.
 
 import numpy as np
+from OpenGL.GL import glIsEnabled, glEnable, glDisable, glBlendFunc, \
+    GL_BLEND, GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA, GL_UNSIGNED_BYTE
 
 from camviz.objects.object import Object
+from camviz.utils.cmaps import class_colors
 
 
 class BBox2D(Object):
@@ -43,3 +46,133 @@ class BBox2D(Object):
         # Set color edge if provided
         if color_edge is not None:
             draw.color(color_edge).size(4).points(self.pts)
+
+
+class BBox2DArray(Object):
+    """
+    Array of 2D bounding boxes drawn from shared buffers
+
+    Parameters
+    ----------
+    draw : camviz.Draw
+        Draw instance (used to create the bounding box buffers)
+    boxes : np.array [N,4]
+        Bounding boxes (left, top, right, bottom)
+    colors : np.array [N,3]
+        Per-box colors (uint8 in [0,255] or float in [0,1])
+    classes : np.array [N]
+        Per-box integer classes, colored using a qualitative palette (if colors are not provided)
+    palette : str
+        Colormap used as palette for classes
+    pose : np.array
+        Bounding box pose on the screen (right, down)
+    """
+    def __init__(self, draw, boxes=None, colors=None, classes=None, palette='tab20', pose=None):
+        super().__init__(pose=pose)
+        self.palette, self.n, self.fill = palette, 0, None
+        self.rgba = np.zeros((0, 4), dtype=np.uint8)
+        # Create buffers with unique names
+        self.verts, self.colors = draw.newBufferName('bbox2d_verts'), draw.newBufferName('bbox2d_colors')
+        self.quads, self.fills = draw.newBufferName('bbox2d_quads'), draw.newBufferName('bbox2d_fills')
+        for vert_name, color_name in [(self.verts, self.colors), (self.quads, self.fills)]:
+            draw.addBuffer2f(vert_name)
+            draw.addBuffer(color_name, (0, 4), np.uint8, GL_UNSIGNED_BYTE)
+        self.buffers = draw.buffers
+        # Upload initial boxes
+        if boxes is not None:
+            self.update(boxes, colors, classes)
+
+    def update(self, boxes, colors=None, classes=None):
+        """
+        Update bounding boxes
+
+        Parameters
+        ----------
+        boxes : np.array [N,4]
+            Bounding boxes (left, top, right, bottom)
+        colors : np.array [N,3]
+            Per-box colors (uint8 in [0,255] or float in [0,1])
+        classes : np.array [N]
+            Per-box integer classes (if colors are not provided)
+        """
+        boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+        n = boxes.shape[0]
+        # Get per-box colors, checking that there is one for each box
+        if colors is None and classes is not None:
+            colors = class_colors(classes, self.palette)
+        if colors is not None:
+            colors = np.asarray(colors)
+            if colors.size != 3 * n:
+                raise ValueError('Expected colors for %d bounding boxes, got %d' % (n, colors.size // 3))
+        self.n = n
+        # Get box corners and line vertices for all edges
+        corners = boxes[:, [0, 1, 2, 1, 2, 3, 0, 3]].reshape(-1, 4, 2)
+        self.corners = corners.reshape(-1, 2)
+        self.buffers[self.verts].update(corners[:, [0, 1, 1, 2, 2, 3, 3, 0]].reshape(-1, 2))
+        # Upload per-vertex colors if provided
+        if colors is not None:
+            if colors.dtype != np.uint8:
+                colors = np.rint(np.clip(colors, 0.0, 1.0) * 255.0).astype(np.uint8)
+            self.rgba = np.full((self.n, 4), 255, dtype=np.uint8)
+            self.rgba[:, :3] = colors.reshape(-1, 3)
+            self.buffers[self.colors].update(np.repeat(self.rgba, 8, axis=0))
+        else:
+            self.rgba = None
+        # Filled boxes are uploaded when drawn
+        self.fill = None
+
+    def release(self):
+        """Release bounding box buffers"""
+        if self.buffers is not None:
+            for name in [self.verts, self.colors, self.quads, self.fills]:
+                if name in self.buffers:
+                    self.buffers.pop(name).delete()
+            self.buffers = None
+
+    def __del__(self):
+        """Release buffers when deleted (ignoring errors if the OpenGL context is already gone)"""
+        try:
+            self.release()
+        except Exception:
+            pass
+
+    def draw(self, draw, color='gre', width=2, fill=None):
+        """
+        Draw 2D bounding boxes on screen
+
+        Parameters
+        ----------
+        draw : camviz.Draw
+            Draw instance
+        color : str
+            Line color (if there are no per-box colors)
+        width : int
+            Line width
+        fill : float
+            If provided, also draw filled boxes with this transparency
+        """
+        if self.n == 0:
+            return
+        # Draw filled boxes with transparency
+        if fill is not None:
+            if self.fill != fill:
+                rgba = np.full((self.n, 4), 255, dtype=np.uint8) if self.rgba is None else self.rgba.copy()
+                rgba[:, 3] = int(round(fill * 255))
+                self.buffers[self.quads].update(self.corners)
+                self.buffers[self.fills].update(np.repeat(rgba, 4, axis=0))
+                self.fill = fill
+            blend = glIsEnabled(GL_BLEND)
+            glEnable(GL_BLEND)
+            glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
+            if self.rgba is None:
+                draw.color(color, a=fill).quads(self.quads)
+            else:
+                draw.quads(self.quads, self.fills)
+            if not blend:
+                glDisable(GL_BLEND)
+        # Draw box edges
+        draw.width(width)
+        if self.rgba is None:
+            draw.color(color).lines(self.verts)
+        else:
+            draw.lines(self.verts, self.colors)
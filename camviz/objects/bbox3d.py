@@ -1,6 +1,11 @@
 # Copyright 2023 Toyota Research Institute.  All rights reserved.
 
+import numpy as np
+from OpenGL.GL import GL_UNSIGNED_BYTE, GL_UNSIGNED_INT
+
 from camviz.objects.object import Object
+from camviz.utils.cmaps import class_colors
+from camviz.utils.geometry import quat2rotmat
 
 
 class BBox3D(Object):
@@ -40,3 +45,199 @@ class BBox3D(Object):
         # Set color edge if provided
         if color_edge is not None:
             draw.color(color_edge).size(4).points(self.pts)
+
+
+class BBox3DArray(Object):
+    """
+    Array of 3D bounding boxes built from parameters and drawn from shared buffers
+
+    Parameters
+    ----------
+    draw : camviz.Draw
+        Draw instance (used to create the bounding box buffers)
+    centers : np.array [N,3]
+        Bounding box centers
+    sizes : np.array [N,3]
+        Bounding box dimensions (length, width, height) along (x, y, z)
+    yaw : np.array [N]
+        Rotation around the up (z) axis in radians
+    quats : np.array [N,4]
+        Bounding box rotations as quaternions (w,x,y,z), used instead of yaw
+    colors : np.array [N,3]
+        Per-box colors (uint8 in [0,255] or float in [0,1])
+    classes : np.array [N]
+        Per-box integer classes, colored using a qualitative palette (if colors are not provided)
+    palette : str
+        Colormap used as palette for classes
+    pose : np.array
+        Pose of the frame of reference of all boxes (x-forward, y-left, z-up)
+    """
+    # Unitary corners, in the same order as BBox3D (+++, +-+, +--, ++-, -++, --+, ---, -+-)
+    UNIT = 0.5 * np.array([[+1, +1, +1], [+1, -1, +1], [+1, -1, -1], [+1, +1, -1],
+                           [-1, +1, +1], [-1, -1, +1], [-1, -1, -1], [-1, +1, -1]], dtype=np.float32)
+    # Corner pairs for each of the 12 edges
+    EDGES = np.array([[0, 1], [1, 2], [2, 3], [3, 0], [4, 5], [5, 6],
+                      [6, 7], [7, 4], [0, 4], [1, 5], [2, 6], [3, 7]], dtype=np.uint32)
+
+    def __init__(self, draw, centers=None, sizes=None, yaw=None, quats=None,
+                 colors=None, classes=None, palette='tab20', pose=None):
+        if centers is not None and sizes is None:
+            raise ValueError('Bounding box sizes are required')
+        super().__init__(pose=pose)
+        self.palette, self.n, self.colored = palette, 0, False
+        self.centers = self.local = self.rot = self.pts = None
+        self.oriented = False
+        # Create buffers with unique names
+        self.verts = draw.newBufferName('bbox3d_verts')
+        draw.addBuffer3f(self.verts)
+        self.colors = draw.newBufferName('bbox3d_colors')
+        draw.addBuffer(self.colors, (0, 3), np.uint8, GL_UNSIGNED_BYTE)
+        self.idx = draw.newBufferName('bbox3d_idx')
+        draw.addBuffer(self.idx, (0, 2), np.uint32, GL_UNSIGNED_INT)
+        self.buffers = draw.buffers
+        # Upload initial boxes
+        if centers is not None:
+            self.update(centers, sizes, yaw, quats, colors, classes)
+
+    @staticmethod
+    def rotations(yaw=None, quats=None, n=None):
+        """Return rotation matrices [N,3,3] from yaw angles or quaternions (identity if neither is provided)"""
+        if quats is not None:
+            return quat2rotmat(np.asarray(quats, dtype=np.float32).reshape(-1, 4))
+        if yaw is None:
+            return np.broadcast_to(np.eye(3, dtype=np.float32), (n, 3, 3))
+        yaw = np.asarray(yaw, dtype=np.float32).reshape(-1)
+        c, s = np.cos(yaw), np.sin(yaw)
+        R = np.zeros((yaw.shape[0], 3, 3), dtype=np.float32)
+        R[:, 0, 0], R[:, 0, 1], R[:, 1, 0], R[:, 1, 1], R[:, 2, 2] = c, -s, s, c, 1.0
+        return R
+
+    @staticmethod
+    def corners(centers, sizes, yaw=None, quats=None):
+        """
+        Compute bounding box corners from parameters
+
+        Parameters
+        ----------
+        centers : np.array [N,3]
+            Bounding box centers
+        sizes : np.array [N,3]
+            Bounding box dimensions (length, width, height) along (x, y, z)
+        yaw : np.array [N]
+            Rotation around the up (z) axis in radians
+        quats : np.array [N,4]
+            Bounding box rotations as quaternions (w,x,y,z), used instead of yaw
+
+        Returns
+        -------
+        corners : np.array [N,8,3]
+            Bounding box corners (same order as BBox3D)
+        """
+        centers = np.asarray(centers, dtype=np.float32).reshape(-1, 3)
+        local = BBox3DArray.UNIT * np.asarray(sizes, dtype=np.float32).reshape(-1, 1, 3)
+        R = BBox3DArray.rotations(yaw, quats, centers.shape[0])
+        return local @ R.transpose(0, 2, 1) + centers[:, np.newaxis]
+
+    def update(self, centers=None, sizes=None, yaw=None, quats=None, colors=None, classes=None):
+        """
+        Update bounding boxes (parameters that are not provided keep their previous values).
+        If the number of boxes changes, sizes and rotations (if any) must be provided again.
+
+        Parameters
+        ----------
+        centers : np.array [N,3]
+            Bounding box centers
+        sizes : np.array [N,3]
+            Bounding box dimensions (length, width, height) along (x, y, z)
+        yaw : np.array [N]
+            Rotation around the up (z) axis in radians
+        quats : np.array [N,4]
+            Bounding box rotations as quaternions (w,x,y,z), used instead of yaw
+        colors : np.array [N,3]
+            Per-box colors (uint8 in [0,255] or float in [0,1])
+        classes : np.array [N]
+            Per-box integer classes (if colors are not provided)
+        """
+        if centers is not None:
+            self.centers = np.asarray(centers, dtype=np.float32).reshape(-1, 3)
+        if self.centers is None:
+            raise ValueError('Bounding box centers are required')
+        n = self.centers.shape[0]
+        # Scale unitary corners only when sizes change
+        if sizes is not None:
+            self.local = self.UNIT * np.asarray(sizes, dtype=np.float32).reshape(-1, 1, 3)
+        if self.local is None:
+            raise ValueError('Bounding box sizes are required')
+        if self.local.shape[0] not in (1, n):
+            raise ValueError('Expected sizes for %d bounding boxes, got %d' % (n, self.local.shape[0]))
+        # Rebuild rotations when they change, or identity rotations when the number of boxes changes
+        if yaw is not None or quats is not None:
+            self.rot, self.oriented = self.rotations(yaw, quats, n), True
+        elif self.rot is None or (not self.oriented and self.rot.shape[0] != n):
+            self.rot, self.oriented = self.rotations(n=n), False
+        if self.rot.shape[0] != n:
+            raise ValueError('Expected rotations for %d bounding boxes, got %d' % (n, self.rot.shape[0]))
+        # Compute and upload corners
+        self.pts = self.local @ self.rot.transpose(0, 2, 1) + self.centers[:, np.newaxis]
+        self.buffers[self.verts].update(self.pts.reshape(-1, 3))
+        # Upload edge indexes only when the number of boxes changes
+        if n != self.n:
+            offsets = 8 * np.arange(n, dtype=np.uint32)
+            self.buffers[self.idx].update((self.EDGES + offsets[:, np.newaxis, np.newaxis]).reshape(-1, 2))
+            self.colored = False
+            self.n = n
+        # Upload per-vertex colors if provided
+        if colors is None and classes is not None:
+            colors = class_colors(classes, self.palette)
+        if colors is not None:
+            colors = np.asarray(colors)
+            if colors.size != 3 * n:
+                raise ValueError('Expected colors for %d bounding boxes, got %d' % (n, colors.size // 3))
+            if colors.dtype != np.uint8:
+                colors = np.rint(np.clip(colors, 0.0, 1.0) * 255.0).astype(np.uint8)
+            self.buffers[self.colors].update(np.repeat(colors.reshape(-1, 3), 8, axis=0))
+            self.colored = True
+
+    def release(self):
+        """Release bounding box buffers"""
+        if self.buffers is not None:
+            for name in [self.verts, self.colors, self.idx]:
+                if name in self.buffers:
+                    self.buffers.pop(name).delete()
+            self.buffers = None
+
+    def __del__(self):
+        """Release buffers when deleted (ignoring errors if the OpenGL context is already gone)"""
+        try:
+            self.release()
+        except Exception:
+            pass
+
+    def draw(self, draw, color_line='gre', color_edge=None, width=2, size=4):
+        """
+        Draw 3D bounding boxes on screen
+
+        Parameters
+        ----------
+        draw : camviz.Draw
+            Draw instance
+        color_line : str
+            Line color (if there are no per-box colors)
+        color_edge : str
+            Corner color
+        width : int
+            Line width
+        size : int
+            Corner size
+        """
+        if self.n == 0:
+            return
+        # Draw all edges with a single indexed call
+        draw.width(width)
+        if self.colored:
+            draw.lines(self.verts, self.colors, idx=self.idx)
+        elif color_line is not None:
+            draw.color(color_line).lines(self.verts, idx=self.idx)
+        # Draw corners if requested
+        if color_edge is not None:
+            draw.color(color_edge).size(size).points(self.verts)
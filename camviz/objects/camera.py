@@ -3,8 +3,9 @@
 import numpy as np
 
 from camviz.objects.object import Object
-from camviz.utils.geometry import transpose, invert
-from camviz.utils.types import is_list, is_float
+from camviz.utils.distortion import distort, undistort
+from camviz.utils.geometry import transpose, transform
+from camviz.utils.types import is_list, is_float, is_numpy
 from camviz.utils.utils import numpyf, add_row0, add_col1, image_grid
 
 
@@ -43,14 +44,21 @@ class Camera(Object):
         Camera intrinsics [3,3]
     pose : np.array
         Object pose
+    D : np.array
+        Distortion coefficients
+        Brown-Conrady: (k1, k2, p1, p2[, k3]), equidistant fisheye: (k1, k2, k3, k4)
+    model : str
+        Distortion model ['brown', 'fisheye']
     """
-    def __init__(self, scale=1.0, wh=None, K=None, pose=None):
+    def __init__(self, scale=1.0, wh=None, K=None, pose=None, D=None, model='brown'):
         # Initialize object super-class
         super().__init__(scale, pose)
+        # Initialize cached ray grids and distortion
+        self.grids, self.model = {}, model
+        self.D = D
         # If intrinsics is provided, use it
         if K is not None:
             self.K = transpose(numpyf(K))
-            self.iK = np.linalg.inv(self.K)
         # If image dimensions is not provided, use it
         if wh is not None:
             if not isinstance(wh, (list, tuple)):
@@ -66,13 +74,66 @@ class Camera(Object):
                          [  0   ,   0   ]])
             self.v = add_row0(self.i2c(scale, uv))
 
+    @property
+    def K(self):
+        """Return camera intrinsics (transposed)"""
+        return self._K
+
+    @K.setter
+    def K(self, K):
+        """Set camera intrinsics (transposed), and invalidate cached ray grids"""
+        self._K = K
+        self.iK = np.linalg.inv(K)
+        self.grids.clear()
+
+    @property
+    def D(self):
+        """Return distortion coefficients"""
+        return self._D
+
+    @D.setter
+    def D(self, D):
+        """Set distortion coefficients, and invalidate cached ray grids"""
+        self._D = None if D is None else np.asarray(numpyf(D), dtype=np.float64).reshape(-1)
+        self.grids.clear()
+
+    def undistort(self, uv):
+        """Convert image coordinates [N,3] to undistorted homogeneous normalized coordinates"""
+        xyz = uv @ self.iK
+        if self.D is not None:
+            xyz[:, :2] = undistort(xyz[:, :2] / xyz[:, 2:], self.D, self.model)
+            xyz[:, 2] = 1.0
+        return xyz
+
+    def rays(self, hw):
+        """
+        Return cached rays for an image resolution, creating them if necessary
+
+        Parameters
+        ----------
+        hw : tuple (height, width)
+            Image resolution
+
+        Returns
+        -------
+        rays : np.array [H*W,3]
+            Rays for each pixel with unitary depth (float32)
+        """
+        hw = (int(hw[0]), int(hw[1]))
+        if hw not in self.grids:
+            u, v = np.meshgrid(np.arange(hw[1], dtype=np.float64),
+                               np.arange(hw[0], dtype=np.float64))
+            uv = np.stack([u.reshape(-1), v.reshape(-1), np.ones(u.size)], 1)
+            self.grids[hw] = self.undistort(uv).astype(np.float32)
+        return self.grids[hw]
+
     @staticmethod
     def from_vidar(cam, b=0, scale=1.0):
         return Camera(K=cam.K[b][:3, :3],
                       pose=cam.Tcw.T[b] if cam.Twc is not None else None,
                       wh=cam.wh, scale=scale)
 
-    def i2c(self, depth=1.0, uv=None):
+    def i2c(self, depth=1.0, uv=None, out=None):
         """
         Project an image to camera coordinates using a depth map
 
@@ -82,12 +143,20 @@ class Camera(Object):
             Depth values for lifting
         uv : np.array
             Image grid for lifting
+        out : np.array [H*W,3]
+            Optional preallocated output (only used when lifting a depth map)
 
         Returns
         -------
         xyz : np.array
             Lifted 3D points in camera frame of reference
         """
+        # If a depth map is provided without a grid, use cached rays
+        if uv is None and is_numpy(depth) and depth.ndim > 1:
+            if depth.ndim == 3:
+                depth = depth[:, :, 0]
+            rays = self.rays(depth.shape)
+            return np.multiply(rays, depth.reshape(-1, 1), out=out, dtype=np.float32)
         # If no grid is provided, uses depth map
         if uv is None:
             if not is_float(depth):
@@ -102,6 +171,8 @@ class Camera(Object):
         # A depth map was provided, create a grid from it
         elif uv.shape[1] > 3:
             uv = image_grid(uv)
+        # Lift grid to normalized coordinates (removing distortion if necessary)
+        xyz = self.undistort(uv)
         # If there are individual depth values per image grid cell
         if not is_float(depth):
             if len(depth.shape) == 1:
@@ -110,7 +181,7 @@ class Camera(Object):
                 if len(depth.shape) == 3:
                     depth = depth[:, :, 0]
                 depth = depth.reshape(-1, 1)
-        return (uv @ self.iK) * depth
+        return xyz * depth
 
     def c2i(self, xyz, filter=False, padding=0, return_z=False):
         """
@@ -136,7 +207,16 @@ class Camera(Object):
         depth : np.array
             Depth values in case return_z was enabled
         """
-        uv = (xyz / xyz[:, 2:] @ self.K)[:, :2]
+        # Project using only the first two intrinsics columns, in the input floating point type
+        dtype = xyz.dtype if np.issubdtype(xyz.dtype, np.floating) else np.float64
+        K = self.K[:, :2].astype(dtype, copy=False)
+        if self.D is None:
+            uv = xyz @ K
+            uv /= xyz[:, 2:]
+        # If there is distortion, apply it to normalized coordinates first
+        else:
+            uv = distort(xyz[:, :2] / xyz[:, 2:], self.D, self.model).astype(dtype, copy=False)
+            uv = uv @ K[:2] + K[2]
         if filter:
             idx = (uv[:, 0] > -padding) & (uv[:, 0] < self.w + padding) & \
                   (uv[:, 1] > -padding) & (uv[:, 1] < self.h + padding) & (xyz[:, 2] > 0)
@@ -153,14 +233,14 @@ class Camera(Object):
     def c2w(self, xyz):
         """Transform 3D points in camera frame of reference to world frame of reference"""
         if xyz.shape[1] == 3:
-            xyz = add_col1(xyz)
+            return transform(xyz, self.T)
         return (xyz @ self.Tt)[:, :3]
 
     def w2c(self, xyz):
         """Transform 3D points in world frame of reference to camera frame of reference"""
         if xyz.shape[1] == 3:
-            xyz = add_col1(xyz)
-        return (xyz @ invert(self.Tt))[:, :3]
+            return transform(xyz, self.pose.Tinv)
+        return (xyz @ self.pose.Tinv.T)[:, :3]
 
     def i2w(self, depth=1.0, uv=None):
         """Lift 2D image points to 3D space in world frame of reference"""
@@ -171,6 +251,60 @@ class Camera(Object):
         return self.c2i(self.w2c(xyz), filter=filter,
                         padding=padding, return_z=return_z)
 
+    def zbuffer(self, xyz, radius=0, world=False):
+        """
+        Rasterize 3D points into a sparse depth map, keeping only the closest point per pixel
+
+        Parameters
+        ----------
+        xyz : np.array [N,3]
+            3D points to be rasterized
+        radius : int
+            Splat radius in pixels (each point covers a (2r+1)x(2r+1) window)
+        world : bool
+            If true, points are in world frame of reference (otherwise in camera frame of reference)
+
+        Returns
+        -------
+        depth : np.array [H,W]
+            Sparse depth map (float32, zero where there are no points)
+        index : np.array [H,W]
+            Index of the point visible at each pixel (-1 where there are no points)
+        """
+        if world:
+            xyz = self.w2c(xyz)
+        w, h = int(self.w), int(self.h)
+        # Project points and round to pixel coordinates
+        with np.errstate(divide='ignore', invalid='ignore'):
+            uv = np.floor(self.c2i(xyz) + 0.5)
+        # Keep points in front of the camera whose windows overlap the image
+        r = radius
+        pid = np.flatnonzero((xyz[:, 2] > 0) & (uv[:, 0] >= -r) & (uv[:, 0] < w + r) &
+                             (uv[:, 1] >= -r) & (uv[:, 1] < h + r))
+        u, v = uv[pid, 0].astype(np.int64) + r, uv[pid, 1].astype(np.int64) + r
+        lin, z = v * (w + 2 * r) + u, xyz[pid, 2].astype(np.float32)
+        # Sort by pixel and then depth, using a single key (positive floats keep their order as integers)
+        order = np.argsort((lin.astype(np.uint64) << np.uint64(32)) | z.view(np.uint32).astype(np.uint64))
+        lin = lin[order]
+        # Keep the first (closest) point of each pixel. Points sharing a pixel also share their
+        # splat windows, so only the closest one can be visible
+        first = np.ones(lin.shape[0], dtype=bool)
+        first[1:] = lin[1:] != lin[:-1]
+        order = order[first]
+        u, v, z, pid = u[order] - r, v[order] - r, z[order], pid[order]
+        depth = np.zeros(h * w, dtype=np.float32)
+        index = np.full(h * w, -1, dtype=np.int64)
+        # Splat points over a window around their pixels (each offset writes unique pixels)
+        for dy in range(-r, r + 1):
+            for dx in range(-r, r + 1):
+                valid = np.flatnonzero((u + dx >= 0) & (u + dx < w) & (v + dy >= 0) & (v + dy < h))
+                pix = (v[valid] + dy) * w + u[valid] + dx
+                if r > 0:
+                    better = (depth[pix] == 0) | (z[valid] < depth[pix])
+                    pix, valid = pix[better], valid[better]
+                depth[pix], index[pix] = z[valid], pid[valid]
+        return depth.reshape(h, w), index.reshape(h, w)
+
     def draw(self, draw, tex=None, axes=True, color='gra', width=4):
         """
         Draw a camera in a 3D screen
@@ -0,0 +1,207 @@
+# Copyright 2023 Toyota Research Institute.  All rights reserved.
+
+import numpy as np
+
+from camviz.objects.camera import Camera
+from camviz.utils.utils import numpyf
+
+
+class CameraBatch:
+    """
+    Create a batch of cameras with stacked intrinsics and poses
+
+    Parameters
+    ----------
+    K : np.array [B,3,3]
+        Camera intrinsics
+    pose : np.array [B,4,4]
+        Camera poses (camera to world), identity if not provided
+    wh : tuple or np.array [B,2]
+        Image dimensions (width, height), shared or per camera
+    """
+    def __init__(self, K, pose=None, wh=None):
+        self.K = numpyf(K).astype(np.float32).reshape(-1, 3, 3)
+        self.iK = np.linalg.inv(self.K)
+        self.grids, self.wh = {}, None
+        self.setPose(pose)
+        # Store image dimensions per camera
+        if wh is not None:
+            self.wh = np.broadcast_to(np.asarray(wh, dtype=np.int64).reshape(-1, 2), (len(self), 2))
+
+    def __len__(self):
+        """Return number of cameras"""
+        return self.K.shape[0]
+
+    def __getitem__(self, b):
+        """Return a single camera from the batch"""
+        return Camera(K=self.K[b], pose=self.T[b],
+                      wh=None if self.wh is None else tuple(self.wh[b]))
+
+    @staticmethod
+    def from_cameras(cameras):
+        """Create a camera batch from a list of cameras"""
+        return CameraBatch(K=np.stack([cam.K.T for cam in cameras]),
+                           pose=np.stack([cam.T for cam in cameras]),
+                           wh=[(cam.w, cam.h) for cam in cameras])
+
+    @staticmethod
+    def from_vidar(cam):
+        """Create a camera batch from a batched vidar camera"""
+        return CameraBatch(K=numpyf(cam.K)[:, :3, :3],
+                           pose=numpyf(cam.Tcw.T) if cam.Twc is not None else None,
+                           wh=cam.wh)
+
+    def setPose(self, pose):
+        """Set camera poses, and invalidate cached world rays"""
+        if pose is None:
+            pose = np.broadcast_to(np.eye(4, dtype=np.float32), (len(self), 4, 4))
+        self.T = numpyf(pose).astype(np.float32).reshape(-1, 4, 4)
+        self.R, self.t = self.T[:, :3, :3], self.T[:, :3, 3]
+        # Rigid inverse (transposed rotation and rotated translation)
+        self.Rinv = self.R.transpose(0, 2, 1)
+        self.tinv = - np.einsum('bij,bj->bi', self.Rinv, self.t)
+        self.grids = {key: val for key, val in self.grids.items() if key[0] == 'cam'}
+
+    def rays(self, hw, world=False):
+        """
+        Return cached rays for an image resolution, creating them if necessary
+
+        Parameters
+        ----------
+        hw : tuple (height, width)
+            Image resolution
+        world : bool
+            If true, return rays rotated to the world frame of reference
+
+        Returns
+        -------
+        rays : np.array [B,H*W,3]
+            Rays for each camera and pixel with unitary depth (float32)
+        """
+        key = ('wld' if world else 'cam', int(hw[0]), int(hw[1]))
+        if key not in self.grids:
+            if world:
+                self.grids[key] = self.rays(hw) @ self.Rinv
+            else:
+                u, v = np.meshgrid(np.arange(hw[1], dtype=np.float32),
+                                   np.arange(hw[0], dtype=np.float32))
+                uv = np.stack([u.reshape(-1), v.reshape(-1), np.ones(u.size, dtype=np.float32)], 1)
+                self.grids[key] = uv @ self.iK.transpose(0, 2, 1)
+        return self.grids[key]
+
+    def _pack(self, xyz, depth, valid):
+        """Pack lifted points from all cameras and return per-camera offsets"""
+        b, n = xyz.shape[:2]
+        if valid:
+            mask = depth.reshape(b, n) > 0
+            counts = np.count_nonzero(mask, axis=1)
+            xyz = xyz[mask]
+        else:
+            counts = np.full(b, n)
+            xyz = xyz.reshape(-1, 3)
+        offsets = np.zeros(b + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        return xyz, offsets
+
+    def i2c(self, depth, valid=False, out=None):
+        """
+        Lift depth maps to 3D points in each camera frame of reference
+
+        Parameters
+        ----------
+        depth : np.array [B,H,W]
+            Depth maps for lifting
+        valid : bool
+            If true, only keep points with positive depth
+        out : np.array [B,H*W,3]
+            Optional preallocated output (before packing)
+
+        Returns
+        -------
+        xyz : np.array [M,3]
+            Packed lifted points (float32)
+        offsets : np.array [B+1]
+            Offsets of each camera in the packed points
+        """
+        depth = numpyf(depth)
+        b, h, w = depth.shape[:3]
+        xyz = np.multiply(self.rays((h, w)), depth.reshape(b, -1, 1), out=out, dtype=np.float32)
+        return self._pack(xyz, depth, valid)
+
+    def i2w(self, depth, valid=False, out=None):
+        """
+        Lift depth maps to 3D points in world frame of reference
+
+        Parameters
+        ----------
+        depth : np.array [B,H,W]
+            Depth maps for lifting
+        valid : bool
+            If true, only keep points with positive depth
+        out : np.array [B,H*W,3]
+            Optional preallocated output (before packing)
+
+        Returns
+        -------
+        xyz : np.array [M,3]
+            Packed lifted points (float32)
+        offsets : np.array [B+1]
+            Offsets of each camera in the packed points
+        """
+        depth = numpyf(depth)
+        b, h, w = depth.shape[:3]
+        xyz = np.multiply(self.rays((h, w), world=True), depth.reshape(b, -1, 1),
+                          out=out, dtype=np.float32)
+        xyz += self.t[:, np.newaxis]
+        return self._pack(xyz, depth, valid)
+
+    def c2w(self, xyz):
+        """Transform 3D points [B,N,3] in camera frames of reference to world frame of reference"""
+        return xyz @ self.Rinv + self.t[:, np.newaxis]
+
+    def w2c(self, xyz):
+        """Transform 3D points [B,N,3] or [N,3] in world frame of reference to camera frames of reference"""
+        return xyz @ self.R + self.tinv[:, np.newaxis]
+
+    def c2i(self, xyz, filter=False, padding=0):
+        """
+        Project 3D points in camera frames of reference to the image planes
+
+        Parameters
+        ----------
+        xyz : np.array [B,N,3]
+            3D points to be projected
+        filter : bool
+            If true, pack points inside image boundaries and in front of the camera (requires wh)
+        padding : int or float
+            Padding for filtering
+
+        Returns
+        -------
+        uv : np.array [B,N,2] or [M,2]
+            2D coordinates of projected points (packed if filtering)
+        z : np.array [B,N] or [M]
+            Depth values of projected points (packed if filtering)
+        offsets : np.array [B+1]
+            Offsets of each camera in the packed outputs (if filtering)
+        mask : np.array [B,N]
+            Valid points for each camera (if filtering)
+        """
+        z = xyz[..., 2]
+        uv = (xyz / z[..., np.newaxis]) @ self.K.transpose(0, 2, 1)
+        uv = uv[..., :2]
+        if not filter:
+            return uv, z
+        if self.wh is None:
+            raise ValueError('wh is required to filter projections')
+        # Filter points outside boundaries
+        wh = self.wh[:, np.newaxis]
+        mask = (uv[..., 0] > -padding) & (uv[..., 0] < wh[..., 0] + padding) & \
+               (uv[..., 1] > -padding) & (uv[..., 1] < wh[..., 1] + padding) & (z > 0)
+        offsets = np.zeros(len(self) + 1, dtype=np.int64)
+        np.cumsum(np.count_nonzero(mask, axis=1), out=offsets[1:])
+        return uv[mask], z[mask], offsets, mask
+
+    def w2i(self, xyz, filter=False, padding=0):
+        """Project 3D points [B,N,3] or [N,3] in world frame of reference to the image planes"""
+        return self.c2i(self.w2c(xyz), filter=filter, padding=padding)
@@ -0,0 +1,155 @@
+# Copyright 2023 Toyota Research Institute.  All rights reserved.
+
+import numpy as np
+from OpenGL.GL import \
+    glEnableClientState, glDisableClientState, glBindBuffer, glVertexPointer, glColorPointer, \
+    glEnableVertexAttribArray, glDisableVertexAttribArray, glVertexAttribPointer, \
+    glUniform1f, glUniform2f, glDrawArrays, \
+    GL_ARRAY_BUFFER, GL_VERTEX_ARRAY, GL_COLOR_ARRAY, GL_POINTS, GL_FALSE, \
+    GL_FLOAT, GL_UNSIGNED_SHORT, GL_UNSIGNED_BYTE
+
+from camviz.containers.buffer import Buffer
+from camviz.objects.object import Object
+from camviz.opengl.opengl_shaders import \
+    DEPTH_VERTEX, COLOR_FRAGMENT, Program, useColormap, releaseColormap
+from camviz.utils.cmaps import sample_percentile
+from camviz.utils.types import is_tensor
+
+
+class DepthCloud(Object):
+    """
+    Pointcloud lifted from a depth map on the GPU
+
+    Camera rays are uploaded only when they change (resolution, intrinsics or distortion),
+    and each frame only uploads the depth map (and optional colors).
+    Points are reconstructed in the vertex stage.
+
+    Parameters
+    ----------
+    camera : camviz.objects.Camera
+        Camera used for lifting (rays include distortion, pose is shared)
+    depth : np.array [H,W]
+        Initial depth map (float, or uint16 scaled by depth_scale)
+    color : np.array [H,W,3]
+        Initial point colors (uint8 in [0,255] or float in [0,1])
+    depth_scale : float
+        Scale applied to depth values on the GPU (e.g. 1/256 for uint16 KITTI depth maps)
+    scale : float
+        Scale used when drawing the object
+    pose : np.array
+        Object pose (if None, the camera pose is used)
+    """
+    def __init__(self, camera, depth=None, color=None, depth_scale=1.0, scale=1.0, pose=None):
+        super().__init__(scale, camera.pose if pose is None else pose)
+        self.camera, self.depth_scale = camera, depth_scale
+        self.rays = self.depth = self.color = self.grid = None
+        self.lims = (0.0, 1.0)
+        if depth is not None:
+            self.update(depth, color)
+
+    def update(self, depth, color=None):
+        """
+        Upload a new depth map (and optional colors)
+
+        Parameters
+        ----------
+        depth : np.array [H,W]
+            Depth map (float, or uint16 scaled by depth_scale)
+        color : np.array [H,W,3]
+            Point colors (uint8 in [0,255] or float in [0,1])
+        """
+        if is_tensor(depth):
+            depth = depth.detach().cpu().numpy()
+        if depth.ndim == 3:
+            depth = depth[..., 0] if depth.shape[-1] == 1 else depth[0]
+        # Upload rays only if they changed (the camera caches one grid per resolution,
+        # and creates a new one if intrinsics or distortion change)
+        rays = self.camera.rays(depth.shape[:2])
+        if rays is not self.grid:
+            if self.rays is None:
+                self.rays = Buffer(rays, np.float32, GL_FLOAT)
+            else:
+                self.rays.update(rays)
+            self.grid = rays
+        # Upload depth values, keeping 16-bit depth maps as they are
+        dtype, gltype = (np.uint16, GL_UNSIGNED_SHORT) if depth.dtype == np.uint16 else (np.float32, GL_FLOAT)
+        if self.depth is None or self.depth.dtype != dtype:
+            self.depth = Buffer(depth.reshape(-1), dtype, gltype)
+        else:
+            self.depth.update(depth.reshape(-1))
+        # Estimate colormap range from a subsample of valid depth values
+        top = sample_percentile(depth, 95, ignore=0)
+        self.lims = (0.0, float(top) * self.depth_scale if np.isfinite(top) and top > 0 else 1.0)
+        # Upload colors if provided
+        if color is not None:
+            if is_tensor(color):
+                color = color.detach().cpu().numpy().transpose(1, 2, 0)
+            dtype, gltype = (np.uint8, GL_UNSIGNED_BYTE) if color.dtype == np.uint8 else (np.float32, GL_FLOAT)
+            if self.color is None or self.color.dtype != dtype:
+                self.color = Buffer(color, dtype, gltype)
+            else:
+                self.color.update(color)
+
+    def draw(self, draw, size=1, color=None, cmap='jet', range=None, alpha=1.0, exp=1.0):
+        """
+        Draw depth cloud on screen
+
+        Parameters
+        ----------
+        draw : camviz.Draw
+            Draw instance
+        size : int
+            Point size
+        color : str or bool
+            Solid point color, True to use uploaded colors, or None to colormap depth
+        cmap : str
+            Colormap used for depth values
+        range : tuple (min,max) or RangeEstimator
+            Colormap depth range (if None, estimated from the last depth map).
+            Estimators must be updated by the caller, and use the estimated range until then
+        alpha : float
+            Colormap transparency
+        exp : float
+            Colormap exponential weight
+        """
+        if self.depth is None or self.depth.n == 0:
+            return
+        draw.size(size)
+        colors = color is True and self.color is not None
+        # Select shader program (colormapped depth or vertex colors)
+        if color is None:
+            program = useColormap(draw.shaders, cmap, self.lims if range is None else range, alpha,
+                                  exp=exp, default=self.lims, program='depthcloud', vertex=DEPTH_VERTEX)
+        else:
+            if not colors and color is not True:
+                draw.color(color)
+            program = draw.shaders.program('depthcloud_color', DEPTH_VERTEX, COLOR_FRAGMENT)
+            program.use()
+            glUniform2f(program.uniform('range'), 0.0, 1.0)
+        glUniform1f(program.uniform('scale'), float(self.depth_scale))
+        # Bind rays as vertices
+        glEnableClientState(GL_VERTEX_ARRAY)
+        glBindBuffer(GL_ARRAY_BUFFER, self.rays.id)
+        glVertexPointer(3, GL_FLOAT, 0, None)
+        # Bind depth as a vertex attribute
+        attr = program.attribute('depth')
+        glEnableVertexAttribArray(attr)
+        glBindBuffer(GL_ARRAY_BUFFER, self.depth.id)
+        glVertexAttribPointer(attr, 1, self.depth.gltype, GL_FALSE, 0, None)
+        # Bind colors if requested
+        if colors:
+            glEnableClientState(GL_COLOR_ARRAY)
+            glBindBuffer(GL_ARRAY_BUFFER, self.color.id)
+            glColorPointer(3, self.color.gltype, 0, None)
+        # Draw points
+        glDrawArrays(GL_POINTS, 0, min(self.rays.n, self.depth.n))
+        # Unbind everything
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+        glDisableVertexAttribArray(attr)
+        glDisableClientState(GL_VERTEX_ARRAY)
+        if colors:
+            glDisableClientState(GL_COLOR_ARRAY)
+        if color is None:
+            releaseColormap()
+        else:
+            Program.release()
@@ -0,0 +1,127 @@
+# Copyright 2023 Toyota Research Institute.  All rights reserved.
+
+import numpy as np
+from OpenGL.GL import glEnable, glDisable, glLightfv, glColorMaterial, glPolygonMode, \
+    glPushMatrix, glPopMatrix, glLoadIdentity, \
+    GL_LIGHTING, GL_LIGHT0, GL_POSITION, GL_COLOR_MATERIAL, GL_FRONT_AND_BACK, \
+    GL_AMBIENT_AND_DIFFUSE, GL_NORMALIZE, GL_LINE, GL_FILL
+
+from camviz.objects.object import Object
+from camviz.utils.mesh import load_mesh, compute_normals
+
+
+class Mesh(Object):
+    """
+    Triangle mesh draw class
+
+    Parameters
+    ----------
+    draw : camviz.Draw
+        Draw instance (used to create the mesh buffers)
+    file : str
+        Mesh file to be loaded (PLY or OBJ)
+    vertices : np.array [N,3]
+        Mesh vertices (if a file is not provided)
+    faces : np.array [F,3]
+        Triangle vertex indexes
+    normals : np.array [N,3]
+        Vertex normals (computed from faces if not provided)
+    colors : np.array [N,3]
+        Vertex colors (uint8 in [0,255] or float in [0,1])
+    scale : float
+        Scale used when drawing the object
+    pose : np.array
+        Mesh pose
+    """
+    def __init__(self, draw, file=None, vertices=None, faces=None, normals=None, colors=None,
+                 scale=1.0, pose=None):
+        super().__init__(scale, pose)
+        # Load mesh from file if provided
+        if file is not None:
+            mesh = load_mesh(file)
+            vertices, faces = mesh['vertices'], mesh['faces']
+            normals = mesh['normals'] if normals is None else normals
+            colors = mesh['colors'] if colors is None else colors
+        # Compute normals if not available
+        if normals is None and faces is not None:
+            normals = compute_normals(vertices, faces)
+        self.n, self.nf = len(vertices), 0 if faces is None else len(faces)
+        # Create buffers with unique names
+        self.verts = draw.newBufferName('mesh_verts')
+        draw.addBufferf(self.verts, vertices)
+        self.faces = self.normals = self.colors = None
+        if faces is not None:
+            self.faces = draw.newBufferName('mesh_faces')
+            draw.addBufferu(self.faces, faces)
+        if normals is not None:
+            self.normals = draw.newBufferName('mesh_normals')
+            draw.addBufferf(self.normals, normals)
+        if colors is not None:
+            colors = np.asarray(colors)
+            if colors.dtype != np.uint8:
+                colors = np.rint(np.clip(colors, 0.0, 1.0) * 255.0).astype(np.uint8)
+            self.colors = draw.newBufferName('mesh_colors')
+            draw.addBufferb(self.colors, colors)
+
+    @staticmethod
+    def light():
+        """Enable lighting with a headlight (from the viewer) and vertex colors as material"""
+        glPushMatrix()
+        glLoadIdentity()
+        glLightfv(GL_LIGHT0, GL_POSITION, (0.0, 0.0, 1.0, 0.0))
+        glPopMatrix()
+        glColorMaterial(GL_FRONT_AND_BACK, GL_AMBIENT_AND_DIFFUSE)
+        for flag in [GL_LIGHTING, GL_LIGHT0, GL_COLOR_MATERIAL, GL_NORMALIZE]:
+            glEnable(flag)
+
+    @staticmethod
+    def unlight():
+        """Disable lighting"""
+        for flag in [GL_LIGHTING, GL_LIGHT0, GL_COLOR_MATERIAL, GL_NORMALIZE]:
+            glDisable(flag)
+
+    def draw(self, draw, color='gra', wire=None, fill=True, lighting=True):
+        """
+        Draw mesh on screen
+
+        Parameters
+        ----------
+        draw : camviz.Draw
+            Draw instance
+        color : str
+            Mesh color (if there are no vertex colors)
+        wire : tuple (color, width)
+            Wireframe color and width, drawn on top of faces (or alone if fill is False)
+        fill : bool
+            If true, draw filled faces
+        lighting : bool
+            If true, shade filled faces using vertex normals
+        """
+        # Meshes without faces are drawn as points
+        if self.faces is None:
+            draw.color(color).points(self.verts, self.colors)
+            return
+        if self.colors is None:
+            draw.color(color)
+        # Draw filled faces (with wireframe if requested)
+        if fill:
+            lit = lighting and self.normals is not None
+            if lit:
+                self.light()
+            draw.tris(self.verts, self.colors, idx=self.faces, wire=wire,
+                      normal=self.normals if lit else None)
+            if lit:
+                self.unlight()
+        # Draw wireframe only
+        elif wire is not None:
+            csw = draw.getCSW()
+            draw.width(wire[1])
+            if wire[0] in draw.buffers:
+                wire_color = wire[0]
+            else:
+                wire_color = None
+                draw.color(wire[0])
+            glPolygonMode(GL_FRONT_AND_BACK, GL_LINE)
+            draw.tris(self.verts, wire_color, idx=self.faces)
+            glPolygonMode(GL_FRONT_AND_BACK, GL_FILL)
+            draw.setCSW(csw)
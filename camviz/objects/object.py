@@ -100,7 +100,7 @@ class Object:
         """
         # Get transformation (aligned or not)
         if align is not None:
-            T = (align @ self.pose).Tt
+            T = (align.T @ self.T).T
         else:
             T = self.Tt
 
@@ -1,32 +1,135 @@
 # Copyright 2023 Toyota Research Institute.  All rights reserved.
 
+import numpy as np
+
 from camviz.objects.object import *
+from camviz.utils.types import is_str, is_tensor
+
+
+def per_point(data, n, name):
+    """Return colors or attributes as [n,C] arrays (flattening grids), raising if they don't have n points"""
+    if is_tensor(data):
+        if data.dim() == 3 and data.shape[0] == 3:
+            data = data.permute(1, 2, 0)
+        data = data.detach().cpu().numpy()
+    data = np.asarray(data)
+    if data.ndim > 1 and data.shape[0] != n and n > 0 and data.size % n == 0:
+        data = data.reshape(n, -1)
+    if data.ndim == 0 or data.shape[0] != n:
+        raise ValueError('Pointcloud has %d points but %d %s' % (n, data.shape[0] if data.ndim > 0 else 1, name))
+    return data
 
 
 class Pointcloud(Object):
     """
-    Bounding Box 3D draw class
+    Pointcloud draw class
 
     Parameters
     ----------
     scale : float
         Scale used when drawing the object
-    pts : np.array
+    pts : np.array [N,3]
         Pointcloud points
     pose : np.array
-        Bounding box pose
+        Pointcloud pose
     draw : camviz.Draw
-        Draw instance
+        Draw instance (if provided, the pointcloud owns uniquely named buffers)
+    colors : np.array [N,3]
+        Point colors (uint8 in [0,255] or float in [0,1])
+    attrs : np.array [N] or [N,C]
+        Point scalar attributes, colormapped when drawing
     """
-    def __init__(self, scale=1.0, pts=None, pose=None, draw=None):
+    def __init__(self, scale=1.0, pts=None, pose=None, draw=None, colors=None, attrs=None):
         super().__init__(scale, pose)
+        self.buffers, self.clr, self.attr = None, None, None
         if draw is not None:
-            draw.addBufferf('pts', pts)
-            self.pts = 'pts'
+            self.buffers = draw.buffers
+            self.pts = draw.newBufferName('pointcloud_pts')
+            if pts is None:
+                draw.addBuffer3f(self.pts)
+            else:
+                draw.addBufferf(self.pts, pts)
+            self.draw_ref = draw
+            self.update(colors=colors, attrs=attrs)
         else:
             self.pts = pts
 
-    def draw(self, draw, size=1, color='whi'):
+    def _upload(self, name, prefix, data, add):
+        """Upload data to a buffer, creating it if it doesn't exist or has a different type"""
+        dtype = np.uint8 if add == 'b' else np.float32
+        if name is not None and self.buffers[name].dtype != dtype:
+            self.draw_ref.delBuffer(name)
+            name = None
+        if name is None:
+            name = self.draw_ref.newBufferName(prefix)
+            if add == 'b':
+                self.draw_ref.addBufferb(name, data)
+            elif add == 'attr':
+                self.draw_ref.addBufferAttr(name, data)
+            else:
+                self.draw_ref.addBufferf(name, data)
+        else:
+            self.buffers[name].update(data)
+        return name
+
+    def update(self, points=None, colors=None, attrs=None):
+        """
+        Update pointcloud buffers (only the provided channels are uploaded).
+        Colors and attributes must match the number of points, and are dropped
+        if the number of points changes without providing new ones.
+
+        Parameters
+        ----------
+        points : np.array [N,3]
+            New point coordinates
+        colors : np.array [N,3]
+            New point colors (uint8 in [0,255] or float in [0,1])
+        attrs : np.array [N] or [N,C]
+            New point scalar attributes
+        """
+        assert self.buffers is not None, 'Pointcloud was not created with a draw instance'
+        # Check that colors and attributes match the number of points (e.g. [H,W,3] grids)
+        if points is not None:
+            points = self.buffers[self.pts].process(points)
+        n = points.shape[0] if points is not None else self.buffers[self.pts].n
+        if colors is not None:
+            colors = per_point(colors, n, 'colors')
+        if attrs is not None:
+            attrs = per_point(attrs, n, 'attrs')
+        if points is not None:
+            # Drop colors and attributes that no longer match the number of points
+            if n != self.buffers[self.pts].n:
+                if self.clr is not None and colors is None:
+                    self.draw_ref.delBuffer(self.clr)
+                    self.clr = None
+                if self.attr is not None and attrs is None:
+                    self.draw_ref.delBuffer(self.attr)
+                    self.attr = None
+            self.buffers[self.pts].update(points)
+        if colors is not None:
+            add = 'b' if getattr(colors, 'dtype', None) == np.uint8 else 'f'
+            self.clr = self._upload(self.clr, 'pointcloud_clr', colors, add)
+        if attrs is not None:
+            self.attr = self._upload(self.attr, 'pointcloud_attr', attrs, 'attr')
+        self.draw_ref.invalidate(self.pts)
+        return self
+
+    def release(self):
+        """Release pointcloud buffers"""
+        if self.buffers is not None:
+            for name in [self.pts, self.clr, self.attr]:
+                if name is not None and name in self.buffers:
+                    self.buffers.pop(name).delete()
+            self.buffers = self.clr = self.attr = None
+
+    def __del__(self):
+        """Release buffers when deleted (ignoring errors if the OpenGL context is already gone)"""
+        try:
+            self.release()
+        except Exception:
+            pass
+
+    def draw(self, draw, size=1, color=None, cmap=None, range=None, channel=0, alpha=1.0, exp=1.0):
         """
         Draw pointcloud on screen
 
@@ -37,7 +140,23 @@ class Pointcloud(Object):
         size : int
             Point size
         color : str
-            Point color
+            Solid point color (if None, use point colors or colormapped attributes if available)
+        cmap : str
+            Colormap for attributes (if provided, attributes are used even if there are point colors)
+        range : tuple (min,max) or RangeEstimator
+            Colormap range (if None, use the attribute channel range)
+        channel : int
+            Attribute channel to be colormapped
+        alpha : float
+            Colormap transparency
+        exp : float
+            Colormap exponential weight
         """
-        draw.color(color).size(size).points(self.pts)
-
+        draw.size(size)
+        if not is_str(self.pts) or color is not None or (self.clr is None and self.attr is None):
+            draw.color('whi' if color is None else color).points(self.pts)
+        elif self.attr is not None and (cmap is not None or self.clr is None):
+            draw.points(self.pts, self.attr, cmap=cmap, range=range, channel=channel,
+                        alpha=alpha, exp=exp)
+        else:
+            draw.points(self.pts, self.clr)
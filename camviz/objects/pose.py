@@ -5,17 +5,13 @@ from copy import deepcopy
 import numpy as np
 
 from camviz.objects.quaternion import Quaternion
-from camviz.utils.geometry import unitX, unitY, unitZ
-from camviz.utils.utils import numpyf, add_col1
+from camviz.utils.geometry import unitX, unitY, unitZ, transform, rotmat2quat
+from camviz.utils.utils import numpyf
 
 
 def rot2quat(R):
-    """Convert rotation matrix to quaternion"""
-    qw = np.sqrt(1.0 + R[0, 0] + R[1, 1] + R[2, 2]) / 2
-    qx = (R[1, 2] - R[2, 1]) / (4.0 * qw)
-    qy = (R[2, 0] - R[0, 2]) / (4.0 * qw)
-    qz = (R[0, 1] - R[1, 0]) / (4.0 * qw)
-    return Quaternion(qw, qx, qy, qz)
+    """Convert rotation matrix to quaternion (robust near 180 degree rotations)"""
+    return Quaternion(tuple(rotmat2quat(R[:3, :3].T).tolist()))
 
 
 class Pose:
@@ -31,7 +27,7 @@ class Pose:
         align : np.array
             Optional transformation matrix used for alignment
         """
-        self.q = self.M = None
+        self.q = self.M = self._inv = None
         # If pose is provided, use it
         if pose is not None:
             self.setPose(pose, align)
@@ -70,17 +66,30 @@ class Pose:
 
     @property
     def inv(self):
-        """Return inverted pose"""
-        Tinv = self.T.copy()
-        Tinv[:3, :3] = np.transpose(self.T[:3, :3])
-        Tinv[:3, -1] = np.matmul(-1. * Tinv[:3, :3], self.T[:3, -1])
-        return Pose(Tinv)
+        """Return inverted pose (cached until the pose changes, should not be modified)"""
+        if self._inv is None:
+            Tinv = self.T.copy()
+            Tinv[:3, :3] = np.transpose(self.T[:3, :3])
+            Tinv[:3, -1] = np.matmul(-1. * Tinv[:3, :3], self.T[:3, -1])
+            self._inv = Pose.from_matrix(Tinv, self.q.invert())
+        return self._inv
 
     @property
     def Tinv(self):
         """Return inverted pose transformation"""
         return self.inv.T
 
+    @staticmethod
+    def from_matrix(M, q):
+        """Create a pose from a transformation matrix and its quaternion (without conversion)"""
+        pose = Pose()
+        pose.M, pose.q = M, q
+        return pose
+
+    def invalidate(self):
+        """Invalidate cached values (should be called if M is changed directly)"""
+        self._inv = None
+
     def translateX(self, m):
         """Translate object in X by m"""
         return self.translate(unitX(m))
@@ -128,7 +137,8 @@ class Pose:
         align : np.array
             Optional transformation matrix used for alignment
         """
-        # Convert to numpy
+        # Invalidate cached values and convert to numpy
+        self.invalidate()
         mat = numpyf(mat)
         # If mat is as 1-dimensional vector
         if len(mat.shape) == 1:
@@ -160,16 +170,19 @@ class Pose:
 
     def reset(self):
         """Reset pose"""
+        self.invalidate()
         self.q = Quaternion()
         self.M = numpyf(np.identity(4))
 
     def translate(self, axis):
         """Translate pose in a certain axis"""
+        self.invalidate()
         self.M[:3, 3] += self.q.rotate(numpyf(axis))
         return self
 
     def rotate(self, deg, axis):
         """Rotate pose by deg in a certain axis"""
+        self.invalidate()
         self.q *= Quaternion(numpyf(axis), deg)
         self.M[:3, :3] = self.q.rotmat().T
         return self
@@ -181,12 +194,15 @@ class Pose:
 
     def __matmul__(self, other):
         """Multiply pose with something else"""
-        # Pose x Pose
+        # Pose x Pose (composing quaternions instead of converting)
         if isinstance(other, Pose):
-            return Pose(self.M @ other.T)
+            return Pose.from_matrix(self.M @ other.T, other.q * self.q)
+        # Let other types (e.g. pose arrays) handle the multiplication
+        elif not hasattr(other, 'shape'):
+            return NotImplemented
         # Pose x points
         elif other.shape[1] == 3:
-            return (add_col1(other) @ self.Tt)[:, :3]
+            return transform(other, self.M)
         # Generic multiplication
         else:
             return self.M @ other.T
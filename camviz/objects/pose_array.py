@@ -0,0 +1,186 @@
+# Copyright 2023 Toyota Research Institute.  All rights reserved.
+
+import numpy as np
+
+from camviz.objects.pose import Pose
+from camviz.objects.quaternion import Quaternion
+from camviz.utils.geometry import quat2rotmat, rotmat2quat
+from camviz.utils.types import is_list, is_tensor
+
+
+class PoseArray:
+    """
+    Array of poses stored as stacked transformation matrices
+
+    Parameters
+    ----------
+    poses : np.array [N,4,4] or [N,7] or list[Pose]
+        Initial poses (transformation matrices, translations + quaternions, or Pose instances)
+    """
+    def __init__(self, poses=None):
+        self._inv = None
+        # If nothing is provided, create an empty array
+        if poses is None:
+            self.M = np.zeros((0, 4, 4))
+        # If it's a list of poses, stack their transformations
+        elif is_list(poses) and len(poses) > 0 and isinstance(poses[0], Pose):
+            self.M = np.stack([pose.T for pose in poses])
+        else:
+            if is_tensor(poses):
+                poses = poses.detach().cpu().numpy()
+            poses = np.asarray(poses)
+            # If it has 7 values per pose, treat them as translation + quaternion
+            if poses.shape[-1] == 7:
+                self.M = PoseArray.from7(poses).M
+            else:
+                self.M = poses.reshape(-1, 4, 4)
+
+    def __len__(self):
+        """Return number of poses"""
+        return self.M.shape[0]
+
+    def __getitem__(self, idx):
+        """Return a single pose, or a pose array if indexing with slices or arrays"""
+        if isinstance(idx, (int, np.integer)):
+            return Pose(self.M[idx].copy())
+        return PoseArray(self.M[idx])
+
+    @property
+    def t(self):
+        """Return pose translations [N,3]"""
+        return self.M[:, :3, 3]
+
+    @property
+    def R(self):
+        """Return pose rotations [N,3,3]"""
+        return self.M[:, :3, :3]
+
+    @property
+    def T(self):
+        """Return pose transformations [N,4,4]"""
+        return self.M
+
+    @property
+    def Tt(self):
+        """Return pose transformations transposed [N,4,4]"""
+        return self.M.transpose(0, 2, 1)
+
+    @property
+    def inv(self):
+        """Return inverted poses (cached until the poses change, should not be modified)"""
+        if self._inv is None:
+            Rinv = self.R.transpose(0, 2, 1)
+            Tinv = np.zeros_like(self.M)
+            Tinv[:, :3, :3] = Rinv
+            Tinv[:, :3, 3] = - np.einsum('nij,nj->ni', Rinv, self.t)
+            Tinv[:, 3, 3] = 1.0
+            self._inv = PoseArray(Tinv)
+        return self._inv
+
+    @property
+    def Tinv(self):
+        """Return inverted pose transformations"""
+        return self.inv.T
+
+    def invalidate(self):
+        """Invalidate cached values (should be called if M is changed directly)"""
+        self._inv = None
+
+    @staticmethod
+    def from7(data):
+        """
+        Create a pose array from packed translations and quaternions
+
+        Parameters
+        ----------
+        data : np.array [N,7]
+            Translations and quaternions (x,y,z,qw,qx,qy,qz), as in Pose.current7
+
+        Returns
+        -------
+        poses : PoseArray
+            Created pose array
+        """
+        data = np.asarray(data).reshape(-1, 7)
+        M = np.zeros((data.shape[0], 4, 4), dtype=np.result_type(data.dtype, np.float32))
+        M[:, :3, 3] = data[:, :3]
+        # Rotations are stored transposed with respect to the quaternions (as in Pose)
+        M[:, :3, :3] = quat2rotmat(data[:, 3:]).transpose(0, 2, 1)
+        M[:, 3, 3] = 1.0
+        return PoseArray(M)
+
+    def to7(self):
+        """Return packed translations and quaternions [N,7] (x,y,z,qw,qx,qy,qz), as in Pose.current7"""
+        return np.concatenate([self.t, rotmat2quat(self.R.transpose(0, 2, 1))], 1)
+
+    def quaternions(self):
+        """Return pose quaternions as Quaternion instances (for compatibility with Pose)"""
+        return [Quaternion(tuple(q)) for q in rotmat2quat(self.R.transpose(0, 2, 1)).tolist()]
+
+    def transform(self, xyz):
+        """
+        Transform points with each pose
+
+        Parameters
+        ----------
+        xyz : np.array [M,3] or [N,M,3]
+            Points shared by all poses, or a set of points per pose
+
+        Returns
+        -------
+        xyz : np.array [N,M,3]
+            Transformed points for each pose
+        """
+        if not np.issubdtype(xyz.dtype, np.floating):
+            xyz = xyz.astype(np.float32)
+        M = self.M.astype(xyz.dtype, copy=False)
+        return xyz @ M[:, :3, :3].transpose(0, 2, 1) + M[:, np.newaxis, :3, 3]
+
+    def relative(self, other):
+        """Return poses of other relative to each pose (self^-1 @ other)"""
+        return self.inv @ other
+
+    def deltas(self, step=1):
+        """Return relative poses between poses separated by step (e.g. consecutive motion)"""
+        return self[:-step].relative(self[step:])
+
+    def axes(self, scale=1.0):
+        """
+        Return coordinate axes for each pose, ready to be drawn as lines
+
+        Parameters
+        ----------
+        scale : float
+            Axes length
+
+        Returns
+        -------
+        verts : np.array [N*6,3]
+            Line vertices (origin and tip of X, Y and Z axes for each pose)
+        colors : np.array [N*6,3]
+            Line colors (red, green and blue for X, Y and Z)
+        """
+        n = len(self)
+        verts = np.empty((n, 3, 2, 3), dtype=np.float32)
+        verts[:, :, 0] = self.t[:, np.newaxis]
+        verts[:, :, 1] = self.t[:, np.newaxis] + scale * self.R.transpose(0, 2, 1)
+        colors = np.broadcast_to(np.eye(3, dtype=np.float32)[:, np.newaxis], (n, 3, 2, 3))
+        return verts.reshape(-1, 3), colors.reshape(-1, 3)
+
+    def __matmul__(self, other):
+        """Multiply poses with something else (broadcasting single poses)"""
+        # PoseArray x PoseArray or Pose
+        if isinstance(other, (PoseArray, Pose)):
+            return PoseArray(self.M @ other.T)
+        # PoseArray x points
+        elif other.shape[-1] == 3:
+            return self.transform(other)
+        # Generic multiplication
+        else:
+            return self.M @ other
+
+    def __rmatmul__(self, other):
+        """Multiply a single pose with a pose array"""
+        if isinstance(other, Pose):
+            return PoseArray(other.T @ self.M)
+        return other @ self.M
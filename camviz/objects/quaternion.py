@@ -4,6 +4,8 @@ import math
 
 import numpy as np
 
+from camviz.utils.geometry import quat2rotmat, rotmat2quat
+
 
 class Quaternion:
     """Quaternion class"""
@@ -19,11 +21,7 @@ class Quaternion:
             # Otherwise, assume it's a rotation matrix
             else:
                 R = np.array(args[0])
-                w = np.sqrt(1.0 + R[0, 0] + R[1, 1] + R[2, 2]) / 2
-                x = (R[1, 2] - R[2, 1]) / (4.0 * w)
-                y = (R[2, 0] - R[0, 2]) / (4.0 * w)
-                z = (R[0, 1] - R[1, 0]) / (4.0 * w)
-                self.coefs = w, x, y, z
+                self.coefs = tuple(rotmat2quat(R[:3, :3].T).tolist())
         # If two arguments are provided, assume it's axis and degree
         elif len(args) == 2:
             v, d = args
@@ -70,3 +68,191 @@ class Quaternion:
                          [2*x*z-2*y*w, 2*y*z+2*x*w, 1-2*xx-2*yy]])
 
 
+class QuaternionArray:
+    """
+    Array of quaternions (w,x,y,z) for batched operations
+
+    Parameters
+    ----------
+    data : np.array [N,4] or [N,3,3] or list[Quaternion]
+        Quaternion coefficients, rotation matrices, or Quaternion instances
+    """
+    def __init__(self, data=None):
+        # If nothing is provided, create an empty array
+        if data is None:
+            self.coefs = np.zeros((0, 4))
+        # If it's a list of quaternions, stack their coefficients
+        elif isinstance(data, list) and len(data) > 0 and isinstance(data[0], Quaternion):
+            self.coefs = np.array([q.coefs for q in data], dtype=np.float64)
+        else:
+            data = np.asarray(data)
+            # If it has [3,3] matrices, convert them
+            if data.shape[-2:] == (3, 3):
+                self.coefs = rotmat2quat(data.reshape(-1, 3, 3))
+            else:
+                self.coefs = data.reshape(-1, 4)
+
+    def __len__(self):
+        """Return number of quaternions"""
+        return self.coefs.shape[0]
+
+    def __getitem__(self, idx):
+        """Return a single quaternion, or a quaternion array if indexing with slices or arrays"""
+        if isinstance(idx, (int, np.integer)):
+            return Quaternion(tuple(self.coefs[idx].tolist()))
+        return QuaternionArray(self.coefs[idx])
+
+    @staticmethod
+    def _coefs(q):
+        """Return coefficients from quaternions, quaternion arrays or numpy arrays"""
+        if isinstance(q, QuaternionArray):
+            return q.coefs
+        if isinstance(q, Quaternion):
+            return np.asarray(q.coefs, dtype=np.float64)
+        return np.asarray(q)
+
+    @staticmethod
+    def multiply(q, r):
+        """Hamilton product of quaternion coefficients [...,4] (same convention as Quaternion.__mul__)"""
+        w1, x1, y1, z1 = np.moveaxis(q, -1, 0)
+        w2, x2, y2, z2 = np.moveaxis(r, -1, 0)
+        return np.stack([w1 * w2 - x1 * x2 - y1 * y2 - z1 * z2,
+                         w1 * x2 + x1 * w2 + y1 * z2 - z1 * y2,
+                         w1 * y2 - x1 * z2 + y1 * w2 + z1 * x2,
+                         w1 * z2 + x1 * y2 - y1 * x2 + z1 * w2], -1)
+
+    def __mul__(self, r):
+        """Multiply quaternions (broadcasting single quaternions)"""
+        return QuaternionArray(self.multiply(self.coefs, self._coefs(r)))
+
+    def __rmul__(self, q):
+        """Multiply a single quaternion with a quaternion array"""
+        return QuaternionArray(self.multiply(self._coefs(q), self.coefs))
+
+    def norm(self):
+        """Return quaternion norms [N]"""
+        return np.linalg.norm(self.coefs, axis=-1)
+
+    def normalize(self):
+        """Return normalized quaternions"""
+        return QuaternionArray(self.coefs / self.norm()[:, np.newaxis])
+
+    def invert(self):
+        """Return inverted quaternions"""
+        coefs = self.coefs * np.array([1.0, -1.0, -1.0, -1.0])
+        return QuaternionArray(coefs / (self.norm() ** 2)[:, np.newaxis])
+
+    def continuous(self):
+        """Return quaternions with flipped signs so consecutive ones lie on the same hemisphere"""
+        dots = np.einsum('ij,ij->i', self.coefs[1:], self.coefs[:-1])
+        signs = np.cumprod(np.concatenate([[1.0], np.where(dots < 0, -1.0, 1.0)]))
+        return QuaternionArray(self.coefs * signs[:, np.newaxis])
+
+    def rotate(self, p):
+        """Rotate points [N,3] (same convention as Quaternion.rotate)"""
+        w, vec = self.coefs[:, :1], self.coefs[:, 1:]
+        uv = np.cross(p, vec)
+        uuv = np.cross(uv, vec)
+        return p + 2 * (w * uv + uuv)
+
+    def rotmat(self):
+        """Return rotation matrices [N,3,3]"""
+        return quat2rotmat(self.coefs)
+
+    @staticmethod
+    def from_rotmat(R):
+        """Create quaternions from rotation matrices [N,3,3]"""
+        return QuaternionArray(rotmat2quat(R))
+
+    @staticmethod
+    def log(q):
+        """Logarithm of unit quaternion coefficients [...,4] (returns pure quaternions)"""
+        v = q[..., 1:]
+        s = np.linalg.norm(v, axis=-1, keepdims=True)
+        angle = np.arctan2(s, q[..., :1])
+        scale = np.where(s > 1e-12, angle / np.maximum(s, 1e-12), 1.0)
+        return np.concatenate([np.zeros_like(s), v * scale], -1)
+
+    @staticmethod
+    def exp(q):
+        """Exponential of pure quaternion coefficients [...,4] (returns unit quaternions)"""
+        v = q[..., 1:]
+        angle = np.linalg.norm(v, axis=-1, keepdims=True)
+        scale = np.where(angle > 1e-12, np.sin(angle) / np.maximum(angle, 1e-12), 1.0)
+        return np.concatenate([np.cos(angle), v * scale], -1)
+
+    @staticmethod
+    def slerp(q0, q1, t):
+        """
+        Spherical linear interpolation between quaternions
+
+        Parameters
+        ----------
+        q0 : np.array [...,4] or QuaternionArray
+            Start quaternions
+        q1 : np.array [...,4] or QuaternionArray
+            End quaternions
+        t : float or np.array [...]
+            Interpolation factors (between 0 and 1)
+
+        Returns
+        -------
+        q : QuaternionArray
+            Interpolated quaternions (taking the shortest path)
+        """
+        q0, q1 = QuaternionArray._coefs(q0), QuaternionArray._coefs(q1)
+        t = np.asarray(t, dtype=np.float64)[..., np.newaxis]
+        dot = np.sum(q0 * q1, -1, keepdims=True)
+        # Take the shortest path
+        q1 = np.where(dot < 0, -q1, q1)
+        dot = np.abs(dot)
+        # Use linear interpolation for nearly parallel quaternions
+        theta = np.arccos(np.clip(dot, -1.0, 1.0))
+        sin = np.sin(theta)
+        linear = sin < 1e-6
+        sin = np.where(linear, 1.0, sin)
+        w0 = np.where(linear, 1.0 - t, np.sin((1.0 - t) * theta) / sin)
+        w1 = np.where(linear, t, np.sin(t * theta) / sin)
+        q = w0 * q0 + w1 * q1
+        return QuaternionArray(q / np.linalg.norm(q, axis=-1, keepdims=True))
+
+    def controls(self):
+        """Return squad control quaternions [N,4] (endpoints are used as their own controls)"""
+        q = self.continuous().coefs
+        prev = np.concatenate([q[:1], q[:-1]])
+        nxt = np.concatenate([q[1:], q[-1:]])
+        qinv = q * np.array([1.0, -1.0, -1.0, -1.0])
+        arg = self.log(self.multiply(qinv, nxt)) + self.log(self.multiply(qinv, prev))
+        return self.multiply(q, self.exp(-0.25 * arg))
+
+    def interpolate(self, times, query, method='slerp'):
+        """
+        Interpolate unit quaternions sampled at increasing times
+
+        Parameters
+        ----------
+        times : np.array [N]
+            Sample times for each quaternion (increasing)
+        query : np.array [M]
+            Query times (clamped to the sampled interval)
+        method : str
+            Interpolation method ['slerp', 'squad']
+
+        Returns
+        -------
+        q : QuaternionArray
+            Interpolated quaternions [M]
+        """
+        assert method in ['slerp', 'squad'], 'Invalid interpolation method'
+        times, query = np.asarray(times, dtype=np.float64), np.asarray(query, dtype=np.float64)
+        q = self.continuous().coefs
+        # Find interval and interpolation factor for each query
+        i = np.clip(np.searchsorted(times, query, side='right') - 1, 0, len(times) - 2)
+        dt = times[i + 1] - times[i]
+        t = np.clip((query - times[i]) / np.where(dt > 0, dt, 1.0), 0.0, 1.0)
+        if method == 'slerp':
+            return self.slerp(q[i], q[i + 1], t)
+        # Squad interpolation using control quaternions
+        s = self.controls()
+        return self.slerp(self.slerp(q[i], q[i + 1], t), self.slerp(s[i], s[i + 1], t),
+                          2.0 * t * (1.0 - t))
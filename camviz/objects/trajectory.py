@@ -0,0 +1,231 @@
+# Copyright 2023 Toyota Research Institute.  All rights reserved.
+
+import numpy as np
+from OpenGL.GL import GL_FLOAT
+
+from camviz.objects.object import Object
+from camviz.objects.pose import Pose
+from camviz.objects.pose_array import PoseArray
+
+# Frustum line segments, as pairs of camera vertices (center to corners, then corner loop)
+FRUSTUM_EDGES = np.array([[4, 0], [4, 1], [4, 2], [4, 3],
+                          [0, 1], [1, 2], [2, 3], [3, 0]]).reshape(-1)
+
+
+class Trajectory(Object):
+    """
+    Trajectory draw class, storing positions in growable buffers that are only appended to
+
+    Parameters
+    ----------
+    draw : camviz.Draw
+        Draw instance (used to create the trajectory buffers)
+    poses : Pose or PoseArray or np.array [N,4,4] or [N,7]
+        Initial poses
+    values : np.array [N] or str
+        Initial values for each pose (colormapped when drawing),
+        'distance' to use the distance traveled since the previous pose,
+        or 'speed' to divide that distance by the time elapsed since the previous pose
+    camera : camviz.objects.Camera
+        Optional camera, drawn as a frustum every few poses
+    every : int
+        Interval between camera frustums
+    capacity : int
+        Initial capacity (doubled when necessary)
+    times : np.array [N]
+        Initial pose timestamps (required for 'speed', unless dt is provided)
+    dt : float
+        Fixed time step between poses (used for 'speed' if timestamps are not provided)
+    scale : float
+        Scale used when drawing the object
+    pose : np.array
+        Trajectory pose (applied to all stored poses when drawing)
+    """
+    def __init__(self, draw, poses=None, values=None, camera=None, every=10, capacity=1024,
+                 times=None, dt=None, scale=1.0, pose=None):
+        super().__init__(scale, pose)
+        self.camera, self.every, self.dt = camera, every, dt
+        self.mode = values if isinstance(values, str) else None
+        if self.mode not in [None, 'distance', 'speed']:
+            raise ValueError('Invalid trajectory values: %s' % values)
+        self.colored = self.mode is not None
+        # Create host arrays
+        self.n, self.capacity = 0, 0
+        self.M = np.zeros((0, 4, 4))
+        self.values = np.zeros((0,), dtype=np.float32)
+        self.times = np.zeros((0,))
+        self._grow(capacity)
+        self.frustum_verts = np.zeros((0, 3), dtype=np.float32)
+        # Create device buffers with unique names
+        self.pts = draw.newBufferName('trajectory_pts')
+        draw.addBuffer(self.pts, (0, 3), np.float32, GL_FLOAT)
+        self.val = draw.newBufferName('trajectory_val')
+        draw.addBuffer(self.val, (0, 1), np.float32, GL_FLOAT, attr=True)
+        self.frs = draw.newBufferName('trajectory_frustums')
+        draw.addBuffer(self.frs, (0, 3), np.float32, GL_FLOAT)
+        self.buffers, self.draw_ref = draw.buffers, draw
+        # Append initial poses
+        if poses is not None:
+            self.append(poses, None if self.mode is not None else values, times=times)
+
+    def __len__(self):
+        """Return number of poses"""
+        return self.n
+
+    @property
+    def poses(self):
+        """Return trajectory poses"""
+        return PoseArray(self.M[:self.n])
+
+    @property
+    def positions(self):
+        """Return trajectory positions [N,3]"""
+        return self.M[:self.n, :3, 3]
+
+    def _grow(self, n):
+        """Grow host arrays to store at least n poses, doubling capacity"""
+        capacity = max(self.capacity, 1)
+        while capacity < n:
+            capacity *= 2
+        if capacity == self.capacity:
+            return
+        M, values, times = self.M, self.values, self.times
+        self.M = np.zeros((capacity, 4, 4), dtype=np.float64)
+        self.values = np.zeros((capacity,), dtype=np.float32)
+        self.times = np.zeros((capacity,), dtype=np.float64)
+        self.M[:self.n], self.values[:self.n], self.times[:self.n] = \
+            M[:self.n], values[:self.n], times[:self.n]
+        self.capacity = capacity
+
+    def _upload(self, name, data, n0, capacity):
+        """Upload rows from n0 onwards to a buffer (everything if the buffer had to grow)"""
+        buffer = self.buffers[name]
+        if buffer.reserve(capacity):
+            buffer.write(data, 0)
+        else:
+            buffer.write(data[n0:], n0)
+
+    def _frustums(self, M):
+        """Return frustum line segments [16*N,3] for camera poses M [N,4,4]"""
+        T = M @ self.camera.T
+        v = self.camera.v[FRUSTUM_EDGES]
+        return (v @ np.swapaxes(T[:, :3, :3], 1, 2) + T[:, np.newaxis, :3, 3]).reshape(-1, 3)
+
+    def append(self, poses, values=None, times=None):
+        """
+        Append poses to the trajectory (only new poses and frustums are uploaded)
+
+        Parameters
+        ----------
+        poses : Pose or PoseArray or np.array [N,4,4] or [N,7]
+            Poses to be appended
+        values : float or np.array [N]
+            Values for each pose (colormapped when drawing)
+        times : float or np.array [N]
+            Pose timestamps (required for 'speed', unless a fixed time step was provided)
+        """
+        M = poses.T[np.newaxis] if isinstance(poses, Pose) else PoseArray(poses).T
+        n0, n1 = self.n, self.n + M.shape[0]
+        if n1 == n0:
+            return
+        if self.mode == 'speed' and times is None and self.dt is None:
+            raise ValueError('Trajectory speed requires timestamps or a fixed time step')
+        # Store new poses, timestamps and values
+        self._grow(n1)
+        self.M[n0:n1] = M
+        if times is not None:
+            self.times[n0:n1] = times
+        elif self.dt is not None:
+            self.times[n0:n1] = self.times[n0 - 1] + self.dt * np.arange(1, n1 - n0 + 1) \
+                if n0 > 0 else self.dt * np.arange(n1 - n0)
+        if self.mode is not None:
+            first = max(n0 - 1, 0)
+            steps = np.linalg.norm(np.diff(self.M[first:n1, :3, 3], axis=0), axis=1)
+            if self.mode == 'speed':
+                elapsed = np.diff(self.times[first:n1])
+                steps = np.divide(steps, elapsed, out=np.zeros_like(steps), where=elapsed > 0)
+            self.values[n0:n1] = 0.0
+            self.values[n1 - steps.shape[0]:n1] = steps
+        elif values is not None:
+            self.values[n0:n1] = values
+            self.colored = True
+        self.n = n1
+        # Upload new positions and values
+        self._upload(self.pts, self.positions, n0, self.capacity)
+        self._upload(self.val, self.values[:n1], n0, self.capacity)
+        # Append frustum segments for new decimated poses
+        if self.camera is not None:
+            start = -(-n0 // self.every) * self.every
+            if start < n1:
+                f0 = self.buffers[self.frs].n
+                verts = self._frustums(self.M[start:n1:self.every])
+                f1 = f0 + verts.shape[0]
+                if f1 > self.frustum_verts.shape[0]:
+                    frustum_verts = np.zeros((max(2 * self.frustum_verts.shape[0], f1), 3), dtype=np.float32)
+                    frustum_verts[:f0] = self.frustum_verts[:f0]
+                    self.frustum_verts = frustum_verts
+                self.frustum_verts[f0:f1] = verts
+                self._upload(self.frs, self.frustum_verts[:f1], f0, self.frustum_verts.shape[0])
+        self.draw_ref.invalidate(self.pts)
+
+    def clear(self):
+        """Remove all poses from the trajectory"""
+        self.n = 0
+        for name in [self.pts, self.val, self.frs]:
+            self.buffers[name].clear()
+        self.buffers[self.val].lims = None
+        self.draw_ref.invalidate(self.pts)
+
+    def release(self):
+        """Release trajectory buffers"""
+        if self.buffers is not None:
+            for name in [self.pts, self.val, self.frs]:
+                if name in self.buffers:
+                    self.buffers.pop(name).delete()
+            self.buffers = None
+
+    def __del__(self):
+        """Release buffers when deleted (ignoring errors if the OpenGL context is already gone)"""
+        try:
+            self.release()
+        except Exception:
+            pass
+
+    def draw(self, draw, color='whi', width=2, cmap='jet', range=None,
+             frustums=True, frustum_color='gra', tex=None):
+        """
+        Draw trajectory on screen
+
+        Parameters
+        ----------
+        draw : camviz.Draw
+            Draw instance
+        color : str
+            Line color (ignored if the trajectory has values)
+        width : int
+            Line width
+        cmap : str
+            Colormap used for values
+        range : tuple (min,max) or RangeEstimator
+            Colormap range (if None, use the range of all values)
+        frustums : bool
+            If true, draw camera frustums every few poses (if a camera was provided)
+        frustum_color : str
+            Camera frustum color
+        tex : str
+            Optional texture to draw on the camera frustums (drawn one image plane at a time)
+        """
+        if self.n == 0:
+            return
+        draw.width(width)
+        if self.colored:
+            draw.strips(self.pts, self.val, cmap=cmap, range=range)
+        else:
+            draw.color(color).strips(self.pts)
+        if frustums and self.camera is not None:
+            draw.color(frustum_color).lines(self.frs)
+            if tex is not None:
+                # Image plane corners are the starting points of each corner loop segment
+                corners = self.frustum_verts[:self.buffers[self.frs].n].reshape(-1, 16, 3)[:, 8::2]
+                for verts in corners:
+                    draw.image(tex, verts=verts)
@@ -0,0 +1,223 @@
+# Copyright 2023 Toyota Research Institute.  All rights reserved.
+
+import numpy as np
+from OpenGL.GL import \
+    glCreateShader, glShaderSource, glCompileShader, glGetShaderiv, glGetShaderInfoLog, \
+    glCreateProgram, glAttachShader, glLinkProgram, glGetProgramiv, glGetProgramInfoLog, \
+    glDeleteShader, glDeleteProgram, glUseProgram, glGetUniformLocation, glGetAttribLocation, \
+    glUniform1f, glUniform1i, glUniform2f, glActiveTexture, glEnable, glDisable, \
+    glGenTextures, glDeleteTextures, glBindTexture, glTexImage1D, glTexParameteri, \
+    GL_VERTEX_SHADER, GL_FRAGMENT_SHADER, GL_COMPILE_STATUS, GL_LINK_STATUS, \
+    GL_TEXTURE0, GL_TEXTURE_1D, GL_TEXTURE_MIN_FILTER, GL_TEXTURE_MAG_FILTER, \
+    GL_TEXTURE_WRAP_S, GL_LINEAR, GL_CLAMP_TO_EDGE, GL_RGB, GL_UNSIGNED_BYTE
+
+from camviz.utils.cmaps import get_lut, RangeEstimator
+
+# Colormap shaders (the scalar value is mapped to a color using a 1D lookup texture)
+COLORMAP_VERTEX = """
+#version 120
+attribute float value;
+uniform vec2 range;
+varying float t;
+void main() {
+    t = (value - range.x) / (range.y - range.x);
+    gl_Position = gl_ModelViewProjectionMatrix * gl_Vertex;
+}
+"""
+
+COLORMAP_FRAGMENT = """
+#version 120
+uniform sampler1D lut;
+uniform float n;
+uniform float alpha;
+varying float t;
+void main() {
+    gl_FragColor = vec4(texture1D(lut, (clamp(t, 0.0, 1.0) * (n - 1.0) + 0.5) / n).rgb, alpha);
+}
+"""
+
+# Depth cloud vertex shader (vertices are unitary rays scaled by a depth attribute)
+DEPTH_VERTEX = """
+#version 120
+attribute float depth;
+uniform float scale;
+uniform vec2 range;
+varying float t;
+void main() {
+    float z = depth * scale;
+    t = (z - range.x) / (range.y - range.x);
+    gl_FrontColor = gl_Color;
+    // Points without valid depth are moved outside of the clipping volume
+    gl_Position = z > 0.0 ? gl_ModelViewProjectionMatrix * vec4(gl_Vertex.xyz * z, 1.0)
+                          : vec4(2.0, 2.0, 2.0, 1.0);
+}
+"""
+
+# Fragment shader using interpolated vertex colors
+COLOR_FRAGMENT = """
+#version 120
+void main() {
+    gl_FragColor = gl_Color;
+}
+"""
+
+
+class Program:
+    """
+    Shader program with cached uniform and attribute locations
+
+    Parameters
+    ----------
+    vertex : str
+        Vertex shader source
+    fragment : str
+        Fragment shader source
+    """
+    def __init__(self, vertex, fragment):
+        self.id = glCreateProgram()
+        shaders = [compileShader(vertex, GL_VERTEX_SHADER),
+                   compileShader(fragment, GL_FRAGMENT_SHADER)]
+        for shader in shaders:
+            glAttachShader(self.id, shader)
+        glLinkProgram(self.id)
+        if not glGetProgramiv(self.id, GL_LINK_STATUS):
+            raise RuntimeError('Shader link error: %s' % glGetProgramInfoLog(self.id))
+        for shader in shaders:
+            glDeleteShader(shader)
+        self.locations = {}
+
+    def uniform(self, name):
+        """Return uniform location"""
+        if name not in self.locations:
+            self.locations[name] = glGetUniformLocation(self.id, name)
+        return self.locations[name]
+
+    def attribute(self, name):
+        """Return attribute location"""
+        if name not in self.locations:
+            self.locations[name] = glGetAttribLocation(self.id, name)
+        return self.locations[name]
+
+    def use(self):
+        """Use shader program"""
+        glUseProgram(self.id)
+
+    def delete(self):
+        """Release shader program (it cannot be used afterwards)"""
+        if self.id is not None:
+            glDeleteProgram(self.id)
+            self.id = None
+
+    @staticmethod
+    def release():
+        """Go back to the fixed pipeline"""
+        glUseProgram(0)
+
+
+def compileShader(source, shader_type):
+    """Compile a shader from source"""
+    shader = glCreateShader(shader_type)
+    glShaderSource(shader, source)
+    glCompileShader(shader)
+    if not glGetShaderiv(shader, GL_COMPILE_STATUS):
+        raise RuntimeError('Shader compile error: %s' % glGetShaderInfoLog(shader))
+    return shader
+
+
+class ShaderCache:
+    """
+    Compiled shader programs and colormap textures of an OpenGL context
+    (OpenGL objects belong to the context that created them, so each draw instance owns a cache)
+    """
+    def __init__(self):
+        self.programs, self.colormaps = {}, {}
+
+    def program(self, name, vertex, fragment):
+        """Return a shader program, compiling it if necessary"""
+        if name not in self.programs:
+            self.programs[name] = Program(vertex, fragment)
+        return self.programs[name]
+
+    def colormap(self, name, exp=1.0):
+        """Return a 1D texture with a colormap lookup table and its size, creating it if necessary"""
+        key = (name, exp)
+        if key not in self.colormaps:
+            lut = np.ascontiguousarray(get_lut(name, exp=exp, dtype=np.uint8))
+            tex = glGenTextures(1)
+            glBindTexture(GL_TEXTURE_1D, tex)
+            glTexParameteri(GL_TEXTURE_1D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
+            glTexParameteri(GL_TEXTURE_1D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
+            glTexParameteri(GL_TEXTURE_1D, GL_TEXTURE_WRAP_S, GL_CLAMP_TO_EDGE)
+            glTexImage1D(GL_TEXTURE_1D, 0, GL_RGB, lut.shape[0], 0, GL_RGB, GL_UNSIGNED_BYTE, lut)
+            glBindTexture(GL_TEXTURE_1D, 0)
+            self.colormaps[key] = tex, lut.shape[0]
+        return self.colormaps[key]
+
+    def delete(self):
+        """Release all programs and colormap textures (the context must be current)"""
+        for program in self.programs.values():
+            program.delete()
+        if len(self.colormaps) > 0:
+            glDeleteTextures([tex for tex, _ in self.colormaps.values()])
+        self.programs, self.colormaps = {}, {}
+
+
+def useColormap(shaders, cmap='jet', range=(0.0, 1.0), alpha=1.0, exp=1.0, default=(0.0, 1.0),
+                program=None, vertex=COLORMAP_VERTEX, fragment=COLORMAP_FRAGMENT):
+    """
+    Enable a colormap shader program
+
+    Parameters
+    ----------
+    shaders : ShaderCache
+        Shader cache of the current context (e.g. draw.shaders)
+    cmap : str
+        Colormap name ('jet' or any matplotlib colormap)
+    range : tuple (min,max) or RangeEstimator
+        Value range mapped to the colormap. Estimators are only read, so they must be
+        updated by the caller (e.g. estimator.update(values) when uploading values)
+    alpha : float
+        Color transparency
+    exp : float
+        Exponential value to weight the color differently (same as get_lut)
+    default : tuple (min,max)
+        Range used if an estimator has no estimate yet
+    program : str
+        Shader program name (for programs with custom vertex stages)
+    vertex : str
+        Vertex shader source (must provide a varying float t)
+    fragment : str
+        Fragment shader source
+
+    Returns
+    -------
+    program : Program
+        Enabled shader program
+    """
+    program = shaders.program('colormap' if program is None else program, vertex, fragment)
+    if isinstance(range, RangeEstimator):
+        range = range.range if range.range is not None else default
+    # Avoid degenerate ranges, which would produce invalid colors (reversed ranges invert the colormap)
+    lo, hi = float(range[0]), float(range[1])
+    if hi == lo:
+        hi = lo + 1e-6 * max(abs(lo), 1.0)
+    tex, n = shaders.colormap(cmap, exp)
+    # Enable program and set uniforms
+    program.use()
+    glUniform2f(program.uniform('range'), lo, hi)
+    glUniform1f(program.uniform('alpha'), float(alpha))
+    glUniform1f(program.uniform('n'), float(n))
+    glUniform1i(program.uniform('lut'), 0)
+    # Bind lookup table texture
+    glActiveTexture(GL_TEXTURE0)
+    glEnable(GL_TEXTURE_1D)
+    glBindTexture(GL_TEXTURE_1D, tex)
+    # Return program
+    return program
+
+
+def releaseColormap():
+    """Disable colormap shader program"""
+    glBindTexture(GL_TEXTURE_1D, 0)
+    glDisable(GL_TEXTURE_1D)
+    Program.release()
@@ -0,0 +1,143 @@
+# Copyright 2023 Toyota Research Institute.  All rights reserved.
+
+import numpy as np
+from OpenGL.GL import glPushMatrix, glPopMatrix, glMultMatrixf, \
+    glGenLists, glNewList, glEndList, glCallList, glDeleteLists, GL_COMPILE_AND_EXECUTE
+
+from camviz.objects.pose import Pose
+
+
+class SceneNode:
+    """
+    Retained scene graph node, with a pose relative to its parent and cached draw commands
+
+    Parameters
+    ----------
+    obj : Object or callable
+        Content of the node (obj.draw(draw, *args, **kwargs) or obj(draw, *args, **kwargs)),
+        or None for grouping nodes
+    args : args
+        Extra draw arguments
+    pose : Pose or np.array
+        Pose relative to the parent node (if None, the object pose is shared)
+    cache : bool
+        If true, draw commands are recorded in a display list and replayed until update() is called
+        (objects whose buffers or shader uniforms change every frame should not be cached)
+    kwargs : kwargs
+        Extra draw arguments
+    """
+    def __init__(self, obj=None, *args, pose=None, cache=True, **kwargs):
+        self.obj, self.args, self.kwargs = obj, args, kwargs
+        # Share object pose if a pose is not provided
+        if pose is None:
+            pose = obj.pose if hasattr(obj, 'pose') else Pose()
+        self.pose = pose if isinstance(pose, Pose) else Pose(pose)
+        self.parent, self.children, self.owner = None, [], None
+        self.cache, self.visible = cache, True
+        # Cached transformations and draw commands
+        self.local, self.world = None, np.eye(4)
+        self.list, self.dirty = None, True
+
+    def add(self, obj=None, *args, **kwargs):
+        """Add a child node (or create one from an object) and return it"""
+        node = obj if isinstance(obj, SceneNode) else SceneNode(obj, *args, **kwargs)
+        if node.parent is not None:
+            node.parent.children.remove(node)
+        node.parent, node.local = self, None
+        self.children.append(node)
+        self.invalidate()
+        return node
+
+    def remove(self, node):
+        """Remove a child node and release its draw commands"""
+        self.children.remove(node)
+        node.parent = None
+        node.release()
+        self.invalidate()
+
+    def setPose(self, pose):
+        """Set node pose relative to its parent"""
+        self.pose.setPose(pose)
+        self.invalidate()
+        return self
+
+    def show(self, flag=True):
+        """Show or hide node (and its children)"""
+        self.visible = flag
+        self.invalidate()
+        return self
+
+    def update(self, *args, **kwargs):
+        """Mark node content as changed, optionally replacing its draw arguments"""
+        if len(args) > 0:
+            self.args = args
+        self.kwargs.update(kwargs)
+        self.dirty = True
+        self.invalidate()
+        return self
+
+    def invalidate(self):
+        """Notify the screen that owns the scene (if any) that it has to be rendered again"""
+        root = self
+        while root.parent is not None:
+            root = root.parent
+        if root.owner is not None:
+            root.owner.invalidateScene()
+
+    def release(self):
+        """Release cached draw commands of the node and its children"""
+        if self.list is not None:
+            glDeleteLists(self.list, 1)
+            self.list, self.dirty = None, True
+        for child in self.children:
+            child.release()
+
+    def _draw(self, draw):
+        """Issue draw commands for the node content"""
+        if hasattr(self.obj, 'draw'):
+            self.obj.draw(draw, *self.args, **self.kwargs)
+        else:
+            self.obj(draw, *self.args, **self.kwargs)
+
+    def render(self, draw, parent=None, changed=False):
+        """
+        Render node and its children
+
+        Parameters
+        ----------
+        draw : camviz.Draw
+            Draw instance
+        parent : np.array [4,4]
+            Parent world transformation
+        changed : bool
+            True if the parent world transformation changed since the last render
+        """
+        # Hidden subtrees are refreshed when shown again
+        if not self.visible:
+            self.local = None
+            return
+        # Recompute world transformation only if it changed
+        T = self.pose.T
+        if changed or self.local is None or not np.array_equal(T, self.local):
+            self.local = T.copy()
+            self.world = self.local if parent is None else parent @ self.local
+            changed = True
+        # Draw content, replaying cached draw commands if possible
+        if self.obj is not None:
+            glPushMatrix()
+            glMultMatrixf(self.world.T)
+            if not self.cache:
+                self._draw(draw)
+            elif self.dirty or self.list is None:
+                if self.list is None:
+                    self.list = glGenLists(1)
+                glNewList(self.list, GL_COMPILE_AND_EXECUTE)
+                self._draw(draw)
+                glEndList()
+                self.dirty = False
+            else:
+                glCallList(self.list)
+            glPopMatrix()
+        # Render children
+        for child in self.children:
+            child.render(draw, self.world, changed)
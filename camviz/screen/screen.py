@@ -4,7 +4,7 @@ from copy import deepcopy
 
 
 class Screen:
-    def __init__(self, luwh, mode):
+    def __init__(self, luwh, mode, cache=False):
         """
         Screen class
 
@@ -14,10 +14,38 @@ class Screen:
             Left/right/width/height values
         mode : str
             Screen mode ('2D_IMAGE' or '3D_WORLD')
+        cache : bool
+            If true, the screen is rendered into its own framebuffer texture, which is
+            reused until its content, viewer or resolution changes
         """
         assert mode in ['2D_IMAGE', '3D_WORLD'], 'Invalid screen mode'
         self.luwh, self.mode = luwh, mode
         self.origin = self.viewer = None
+        # Initialize render cache
+        self.cache, self.fbo, self.dirty, self.drawn, self.state = cache, None, True, False, None
+        self.uses, self.callbacks = set(), []
+
+    def viewState(self):
+        """Return a snapshot of everything that affects how the screen is displayed"""
+        return tuple(self.luwh)
+
+    def changed(self):
+        """Return True if the screen needs to be rendered again"""
+        return self.dirty or self.fbo is None or self.viewState() != self.state
+
+    def invalidate(self):
+        """Mark screen contents as changed"""
+        self.dirty = True
+
+    def validate(self):
+        """Mark screen as rendered with its current state"""
+        self.dirty, self.state = False, self.viewState()
+
+    def use(self, *names):
+        """Record textures and buffers drawn on the screen (so their updates invalidate it)"""
+        for name in names:
+            if isinstance(name, str):
+                self.uses.add(name)
 
     def inside(self, pos):
         """
@@ -1,10 +1,12 @@
 # Copyright 2023 Toyota Research Institute.  All rights reserved.
 
+import numpy as np
 from OpenGL.GL import GL_PROJECTION, GL_DEPTH_TEST, GL_MODELVIEW
-from OpenGL.GL import glMatrixMode, glLoadIdentity, glDisable
+from OpenGL.GL import glMatrixMode, glLoadIdentity, glLoadMatrixf, glDisable
 from OpenGL.GLU import gluOrtho2D
 
 from camviz.screen.screen import Screen
+from camviz.utils.geometry import ortho2d
 
 
 class Screen2Dimage(Screen):
@@ -17,13 +19,16 @@ class Screen2Dimage(Screen):
         Left/up/width/height values
     res : tuple
         Image resolution
+    cache : bool
+        If true, render screen into a cached framebuffer texture
     """
-    def __init__(self, luwh, res):
-        super().__init__(luwh, '2D_IMAGE')
+    def __init__(self, luwh, res, cache=False):
+        super().__init__(luwh, '2D_IMAGE', cache)
         # Get resolution from dimensions if not provided
         if res is None:
             res = (self.luwh[2], self.luwh[3])
         # Initialize values
+        self.proj_cache = None
         self.setRes(res)
         self.orig_res = list(self.res)
         self.background = 'whi'
@@ -33,13 +38,29 @@ class Screen2Dimage(Screen):
         self.res = [0, 0, res[0], res[1]]
         self.prepare()
 
+    def viewState(self):
+        """Return a snapshot of dimensions and resolution"""
+        return tuple(self.luwh), tuple(self.res)
+
+    def updateProjection(self):
+        """Recompute orthographic projection if the resolution changed, returning it for OpenGL"""
+        key = tuple(self.res)
+        if self.proj_cache is None or self.proj_cache[0] != key:
+            proj = ortho2d(self.res[0], self.res[2], self.res[3], self.res[1])
+            self.proj_cache = (key, proj, np.ascontiguousarray(proj.T, dtype=np.float32))
+        return self.proj_cache[2]
+
+    @property
+    def projection(self):
+        """Orthographic projection matrix [4,4] (row-major)"""
+        self.updateProjection()
+        return self.proj_cache[1]
+
     def prepare(self):
         """Prepare screen for display"""
         glMatrixMode(GL_PROJECTION)
-        glLoadIdentity()
+        glLoadMatrixf(self.updateProjection())
         glDisable(GL_DEPTH_TEST)
-        gluOrtho2D(self.res[0], self.res[2],
-                   self.res[3], self.res[1])
         glMatrixMode(GL_MODELVIEW)
         glLoadIdentity()
 
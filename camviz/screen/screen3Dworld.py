@@ -4,10 +4,12 @@ import OpenGL.GL as gl
 import OpenGL.GLUT as glut
 import numpy as np
 from OpenGL.GL import GL_PROJECTION, GL_DEPTH_TEST, GL_MODELVIEW, GL_BLEND, GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA
-from OpenGL.GL import glMatrixMode, glEnable, glDisable, glLoadIdentity, glMultMatrixf, glBlendFunc
-from OpenGL.GLU import gluPerspective, gluLookAt, gluOrtho2D
+from OpenGL.GL import glMatrixMode, glEnable, glDisable, glLoadMatrixf, glBlendFunc
+from OpenGL.GLU import gluOrtho2D
 from camviz.objects.pose import Pose
+from camviz.screen.scene import SceneNode
 from camviz.screen.screen import Screen
+from camviz.utils.geometry import perspective, look_at
 
 
 class Screen3Dworld(Screen):
@@ -30,15 +32,21 @@ class Screen3Dworld(Screen):
         Virtual camera pose
     ref : str
         Coordinate reference system ['cam', 'lidar']
+    cache : bool
+        If true, render screen into a cached framebuffer texture
     """
     def __init__(self, luwh, wh=None, K=None, nf=(0.01, 10000.0),
-                 enable_blending=False, background='bla', pose=None, ref='cam'):
-        super().__init__(luwh, '3D_WORLD')
+                 enable_blending=False, background='bla', pose=None, ref='cam', cache=False):
+        super().__init__(luwh, '3D_WORLD', cache)
         self.wh, self.K, self.nf = wh, K, nf
         self.viewer = self.origin = self.P = None
+        self.proj_cache = self.view_cache = None
         self.enable_blending = enable_blending
         self.background = background
         self.ref = ref
+        # Create retained scene graph root
+        self.scene, self.draw_ref = SceneNode(), None
+        self.scene.owner = self
         # Start and prepare screen
         self.start()
         self.prepare()
@@ -58,42 +66,101 @@ class Screen3Dworld(Screen):
         if self.wh is not None and self.K is not None:
             self.calibrate()
 
+    def viewState(self):
+        """Return a snapshot of dimensions, viewer pose and projection"""
+        return tuple(self.luwh), self.viewer.T.tobytes(), self.projectionKey()
+
+    def projectionKey(self):
+        """Return everything the projection matrix depends on"""
+        return None if self.K is None else np.asarray(self.K).tobytes(), \
+            None if self.wh is None else tuple(self.wh), tuple(self.nf), self.luwh[2], self.luwh[3]
+
+    def updateProjection(self):
+        """Recompute projection matrix if intrinsics, near/far or dimensions changed, returning it for OpenGL"""
+        key = self.projectionKey()
+        if self.proj_cache is None or self.proj_cache[0] != key:
+            # If calibration is provided, use it
+            if self.wh is not None and self.K is not None:
+                self.calibrate()
+                proj = self.P.T
+            # Otherwise, use a default perspective
+            else:
+                proj = perspective(45, self.luwh[2] / self.luwh[3], self.nf[0], self.nf[1])
+            self.proj_cache = (key, proj, np.ascontiguousarray(proj.T, dtype=np.float32))
+        return self.proj_cache[2]
+
+    def updateView(self):
+        """Recompute view matrix if the viewer pose changed, returning it for OpenGL"""
+        T = self.viewer.T
+        key = T.tobytes()
+        if self.view_cache is None or self.view_cache[0] != key:
+            # Look along Z, with -Y as the up vector
+            view = look_at(T[:3, 3], T[:3, 3] + T[:3, 2], - T[:3, 1])
+            self.view_cache = (key, view, np.ascontiguousarray(view.T, dtype=np.float32))
+        return self.view_cache[2]
+
+    @property
+    def projection(self):
+        """Projection matrix [4,4] (row-major)"""
+        self.updateProjection()
+        return self.proj_cache[1]
+
+    @property
+    def view(self):
+        """View matrix [4,4] (row-major)"""
+        self.updateView()
+        return self.view_cache[1]
+
     def prepare(self):
         """Prepare screen for display"""
-        glMatrixMode(GL_PROJECTION)
-        glLoadIdentity()
-
         if self.enable_blending:
             glDisable(GL_DEPTH_TEST)
             glEnable(GL_BLEND)
             glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
         else:
             glEnable(GL_DEPTH_TEST)
-
-        # If calibration matrix is provided, use it
-        if self.P is not None:
-            glMultMatrixf(self.P)
-        # Otherwise, use a default perspective
-        else:
-            gluPerspective(45, self.luwh[2] / self.luwh[3],
-                           self.nf[0], self.nf[1])
-
+        # Load cached matrices
+        glMatrixMode(GL_PROJECTION)
+        glLoadMatrixf(self.updateProjection())
         glMatrixMode(GL_MODELVIEW)
-        glLoadIdentity()
+        glLoadMatrixf(self.updateView())
+
+    def add(self, obj, *args, parent=None, **kwargs):
+        """
+        Add an object to the retained scene
+
+        Parameters
+        ----------
+        obj : Object or callable or SceneNode
+            Object to be added
+        args : args
+            Extra draw arguments
+        parent : SceneNode
+            Parent node (if None, the scene root is used)
+        kwargs : kwargs
+            Extra node arguments (pose, cache) and draw arguments
+
+        Returns
+        -------
+        node : SceneNode
+            Scene node for the object
+        """
+        return (self.scene if parent is None else parent).add(obj, *args, **kwargs)
+
+    def remove(self, node):
+        """Remove a node from the retained scene"""
+        node.parent.remove(node)
+
+    def invalidateScene(self):
+        """Mark the retained scene as changed, waking up the render loop of the draw instance (if any)"""
+        if self.draw_ref is not None:
+            self.draw_ref.invalidate(self)
+        else:
+            self.invalidate()
 
-        # Determine look vector
-        T = self.viewer.T
-        gluLookAt(
-            T[0, 3],
-            T[1, 3],
-            T[2, 3],
-            T[0, 3] + T[0, 2],
-            T[1, 3] + T[1, 2],
-            T[2, 3] + T[2, 2],
-            - T[0, 1],
-            - T[1, 1],
-            - T[2, 1],
-        )
+    def render(self, draw):
+        """Render the retained scene"""
+        self.scene.render(draw)
 
     def calibrate(self):
         """Calibrate screen for display"""
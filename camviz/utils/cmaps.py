@@ -5,8 +5,239 @@ from matplotlib.cm import get_cmap
 
 from camviz.utils.types import is_numpy, is_tensor
 
+# Cache of precomputed colormap lookup tables
+LUTS = {}
 
-def jet(data, range=None, exp=1.0):
+
+def jet_lut(n=1024):
+    """
+    Creates a JET lookup table
+
+    Parameters
+    ----------
+    n : int
+        Number of entries
+
+    Returns
+    -------
+    lut : np.array [n,3]
+        JET lookup table (float32 in [0,1])
+    """
+    data = np.linspace(0.0, 1.0, n, dtype=np.float32)
+    lut = np.ones((n, 3), dtype=np.float32)
+    # First stage
+    idx = (data <= 0.33)
+    lut[idx, 1] = data[idx] / 0.33
+    lut[idx, 0] = 0.0
+    # Second stage
+    idx = (data > 0.33) & (data <= 0.67)
+    lut[idx, 0] = (data[idx] - 0.33) / 0.33
+    lut[idx, 2] = 1.0 - lut[idx, 0]
+    # Third stage
+    idx = data > 0.67
+    lut[idx, 1] = 1.0 - (data[idx] - 0.67) / 0.33
+    lut[idx, 2] = 0.0
+    # Return lookup table
+    return lut
+
+
+def get_lut(name='jet', n=None, exp=1.0, dtype=np.float32):
+    """
+    Return a colormap lookup table, computing and caching it if necessary
+
+    Parameters
+    ----------
+    name : str
+        Colormap name ('jet' or any matplotlib colormap)
+    n : int
+        Number of entries (if None, 1024 for jet and 256 otherwise)
+    exp : float
+        Exponential value to weight the color differently
+    dtype : numpy type
+        Lookup table type (np.uint8 in [0,255] or np.float32 in [0,1])
+
+    Returns
+    -------
+    lut : np.array [n,3]
+        Colormap lookup table
+    """
+    if n is None:
+        n = 1024 if name == 'jet' else 256
+    key = (name, n, exp, np.dtype(dtype))
+    if key not in LUTS:
+        # Create base lookup table
+        if name == 'jet':
+            lut = jet_lut(n)
+        else:
+            lut = get_cmap(name, n)(np.linspace(0.0, 1.0, n))[:, :3].astype(np.float32)
+        # Bake exponential into the lookup table
+        if exp != 1.0:
+            lut = lut[np.rint(np.linspace(0.0, 1.0, n) ** exp * (n - 1)).astype(np.int64)]
+        # Convert to the requested type
+        if np.dtype(dtype) == np.uint8:
+            lut = np.rint(lut * 255.0).astype(np.uint8)
+        else:
+            lut = lut.astype(dtype)
+        LUTS[key] = lut
+    return LUTS[key]
+
+
+def class_colors(classes, name='tab20', n=20, dtype=np.uint8):
+    """Return colors [N,3] for integer class labels [N], cycling through a qualitative colormap"""
+    return np.take(get_lut(name, n, dtype=dtype), np.asarray(classes, dtype=np.int64) % n, axis=0)
+
+
+def sample_percentile(data, q, samples=1 << 16, ignore=None):
+    """
+    Estimates percentiles from a strided subsample of the data
+
+    Parameters
+    ----------
+    data : np.array
+        Data to be analyzed
+    q : float or tuple
+        Percentile values (between 0 and 100)
+    samples : int
+        Maximum number of samples used for the estimation
+    ignore : float
+        Optional value to be ignored (e.g. 0 for invalid depth)
+
+    Returns
+    -------
+    values : float or np.array
+        Estimated percentiles
+    """
+    data = data.reshape(-1)
+    data = data[::max(1, data.size // samples)]
+    valid = np.isfinite(data)
+    if ignore is not None:
+        valid &= data != ignore
+    data = data[valid]
+    # Return zeros if there is no valid data
+    if data.size == 0:
+        return np.zeros_like(np.asarray(q, dtype=np.float64))
+    return np.percentile(data, q)
+
+
+class RangeEstimator:
+    """
+    Streaming range estimator for colorization
+
+    Ranges are estimated from a fixed-size subsample of each frame and smoothed
+    across frames, so colors are stable over time and cheap to compute.
+    It can be used wherever a colorization range is expected (e.g. jet or
+    Buffer.updateJET), and is updated every time it is used.
+
+    Parameters
+    ----------
+    percentile : tuple (min,max)
+        Percentiles used to determine the range
+    momentum : float
+        Weight of new estimates (1.0 means no smoothing)
+    samples : int
+        Maximum number of samples used per estimation
+    ignore : float
+        Optional value to be ignored (e.g. 0 for invalid depth)
+    """
+    def __init__(self, percentile=(0, 100), momentum=0.1, samples=1 << 16, ignore=None):
+        self.percentile, self.momentum = percentile, momentum
+        self.samples, self.ignore = samples, ignore
+        self.range = None
+
+    def update(self, data):
+        """Update range with new data and return it"""
+        if is_tensor(data):
+            data = data.detach().cpu().numpy()
+        lo, hi = sample_percentile(data, self.percentile, self.samples, self.ignore)
+        lo, hi = float(lo), float(hi)
+        # Initialize or smooth range
+        if self.range is None:
+            self.range = lo, hi
+        else:
+            m = self.momentum
+            self.range = (1.0 - m) * self.range[0] + m * lo, \
+                         (1.0 - m) * self.range[1] + m * hi
+        return self.range
+
+    def reset(self):
+        """Reset range"""
+        self.range = None
+
+
+def get_range(data, range=None, percentile=None):
+    """
+    Return the value range used for colorization
+
+    Parameters
+    ----------
+    data : np.array
+        Data to be colorized
+    range : tuple (min,max) or RangeEstimator
+        Fixed or streaming range (if None, use percentile or min and max from data)
+    percentile : tuple (min,max)
+        Percentiles used to determine the range (e.g. (5, 95)), estimated from a subsample
+
+    Returns
+    -------
+    range : tuple (min,max)
+        Colorization range
+    """
+    if isinstance(range, RangeEstimator):
+        return range.update(data)
+    if range is not None:
+        return range
+    if percentile is not None:
+        lo, hi = sample_percentile(data, percentile)
+        return lo, hi
+    return np.min(data), np.max(data)
+
+
+def colormap(data, name='jet', range=None, percentile=None, exp=1.0,
+             dtype=np.float32, out=None, n=None):
+    """
+    Colorizes data using a precomputed lookup table
+
+    Parameters
+    ----------
+    data : np.array [...]
+        Data to be converted into a colormap
+    name : str
+        Colormap name ('jet' or any matplotlib colormap)
+    range : tuple (min,max) or RangeEstimator
+        Optional fixed or streaming range for the colormap
+    percentile : tuple (min,max)
+        Optional percentile range for the colormap (used if range is None)
+    exp : float
+        Exponential value to weight the color differently
+    dtype : numpy type
+        Output type (np.uint8 in [0,255] or np.float32 in [0,1])
+    out : np.array [...,3]
+        Optional preallocated output
+    n : int
+        Number of lookup table entries
+
+    Returns
+    -------
+    colormap : np.array [...,3]
+        Colormap obtained from data
+    """
+    # If data is a tensor, convert to numpy
+    if is_tensor(data):
+        data = data.detach().cpu().numpy()
+    lut = get_lut(name, n, exp, dtype)
+    n = lut.shape[0]
+    # Get range and map data to lookup table indices
+    lo, hi = get_range(data, range, percentile)
+    idx = np.subtract(data, lo, dtype=np.float32)
+    # Reversed ranges invert the colormap, and degenerate ranges use its first color
+    d = float(hi) - float(lo)
+    idx *= (n - 1) / d if d != 0 else 0.0
+    idx += 0.5
+    # Lookup colors (out-of-range indices are clipped to the table borders)
+    return np.take(lut, idx.astype(np.intp), axis=0, out=out, mode='clip')
+
+
+def jet(data, range=None, exp=1.0, dtype=np.float32, out=None):
     """
     Creates a JET colormap from data
 
@@ -14,10 +245,14 @@ def jet(data, range=None, exp=1.0):
     ----------
     data : np.array [N,1]
         Data to be converted into a colormap
-    range : tuple (min,max)
+    range : tuple (min,max) or RangeEstimator
         Optional range value for the colormap (if None, use min and max from data)
     exp : float
         Exponential value to weight the color differently
+    dtype : numpy type
+        Output type (np.uint8 in [0,255] or np.float32 in [0,1])
+    out : np.array [N,3]
+        Optional preallocated output
 
     Returns
     -------
@@ -34,30 +269,5 @@ def jet(data, range=None, exp=1.0):
         # If data is [N,1], remove second dimensions
         if len(data.shape) > 1:
             data = data.reshape(-1)
-        # Determine range if not available
-        if range is None:
-            data = data.copy() - np.min(data)
-            data = data / (np.max(data) + 1e-6)
-        else:
-            data = (data - range[0]) / (range[1] - range[0])
-            data = np.maximum(np.minimum(data, 1.0), 0.0)
-        # Use exponential if requested
-        if exp != 1.0:
-            data = data ** exp
-        # Initialize colormap
-        jet = np.ones((data.shape[0], 3), dtype=np.float32)
-        # First stage
-        idx = (data <= 0.33)
-        jet[idx, 1] = data[idx] / 0.33
-        jet[idx, 0] = 0.0
-        # Second stage
-        idx = (data > 0.33) & (data <= 0.67)
-        jet[idx, 0] = (data[idx] - 0.33) / 0.33
-        jet[idx, 2] = 1.0 - jet[idx, 0]
-        # Third stage
-        idx = data > 0.67
-        jet[idx, 1] = 1.0 - (data[idx] - 0.67) / 0.33
-        jet[idx, 2] = 0.0
         # Return colormap
-        return jet
-
+        return colormap(data, 'jet', range=range, exp=exp, dtype=dtype, out=out)
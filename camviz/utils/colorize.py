@@ -0,0 +1,121 @@
+# Copyright 2023 Toyota Research Institute.  All rights reserved.
+
+import numpy as np
+
+from camviz.utils.types import is_list, is_tensor
+
+
+def bilinear(image, uv):
+    """
+    Sample an image at subpixel coordinates using bilinear interpolation
+
+    Parameters
+    ----------
+    image : np.array [H,W,C]
+        Image to be sampled
+    uv : np.array [N,2]
+        Sampling coordinates (pixel centers at integer values)
+
+    Returns
+    -------
+    values : np.array [N,C]
+        Sampled values (float32)
+    """
+    h, w = image.shape[:2]
+    flat = image.reshape(h * w, -1)
+    # Get top-left pixel and interpolation weights
+    u = np.clip(uv[:, 0], 0, w - 1).astype(np.float32)
+    v = np.clip(uv[:, 1], 0, h - 1).astype(np.float32)
+    u0 = np.minimum(u.astype(np.int64), max(w - 2, 0))
+    v0 = np.minimum(v.astype(np.int64), max(h - 2, 0))
+    du = (u - u0.astype(np.float32))[:, np.newaxis]
+    dv = (v - v0.astype(np.float32))[:, np.newaxis]
+    # Offsets to right and bottom neighbors (single-pixel dimensions reuse the same pixel)
+    right, down = (1 if w > 1 else 0), (w if h > 1 else 0)
+    # Interpolate between the four neighbors
+    idx = v0 * w + u0
+    top = np.take(flat, idx, axis=0).astype(np.float32)
+    top += (np.take(flat, idx + right, axis=0) - top) * du
+    bot = np.take(flat, idx + down, axis=0).astype(np.float32)
+    bot += (np.take(flat, idx + down + right, axis=0) - bot) * du
+    top += (bot - top) * dv
+    return top
+
+
+def colorize(xyz, cameras, images, mode='nearest', occlusion=True,
+             tolerance=0.1, background=(0, 0, 0)):
+    """
+    Colorize 3D points in world frame of reference from camera images
+
+    Parameters
+    ----------
+    xyz : np.array [N,3]
+        3D points to be colorized
+    cameras : Camera or list[Camera]
+        Cameras used for colorization
+    images : np.array [H,W,3] or list[np.array]
+        Images for each camera (uint8 in [0,255] or float in [0,1], alpha channels are ignored)
+    mode : str
+        How to resolve points visible in multiple cameras
+        ['nearest' uses the camera closest to the point, 'first' uses the first camera]
+    occlusion : bool
+        If true, points occluded by other points in a camera are not colorized by it
+    tolerance : float
+        Relative depth tolerance for occlusion checks
+    background : tuple
+        Color for points that are not visible in any camera
+
+    Returns
+    -------
+    colors : np.array [N,3]
+        Point colors (uint8, ready for addBufferb)
+    visible : np.array [N]
+        Index of the camera used for each point (-1 if not visible)
+    """
+    assert mode in ['nearest', 'first'], 'Invalid colorization mode'
+    if not is_list(cameras):
+        cameras, images = [cameras], [images]
+    n = xyz.shape[0]
+    # Find which camera colorizes each point, and where
+    visible = np.full(n, -1, dtype=np.int64)
+    best = np.full(n, np.inf, dtype=np.float32)
+    coords = np.zeros((n, 2), dtype=np.float32)
+    for i, cam in enumerate(cameras):
+        # Project points and keep the ones inside the image
+        xyz_c = cam.w2c(xyz)
+        uv, z, idx = cam.c2i(xyz_c, filter=True, return_z=True)
+        idx, z = np.flatnonzero(idx), z[:, 0]
+        # Round to pixels with the same rule as Camera.zbuffer (centers at integer values)
+        px = np.floor(uv + 0.5).astype(np.int64)
+        keep = (px[:, 0] >= 0) & (px[:, 0] < int(cam.w)) & (px[:, 1] >= 0) & (px[:, 1] < int(cam.h))
+        idx, uv, z, px = idx[keep], uv[keep], z[keep], px[keep]
+        # Remove points occluded by closer points
+        if occlusion:
+            depth, _ = cam.zbuffer(xyz_c[idx])
+            keep = z <= depth[px[:, 1], px[:, 0]] * (1.0 + tolerance)
+            idx, uv, z = idx[keep], uv[keep], z[keep]
+        # Select which points are colorized by this camera
+        if mode == 'nearest':
+            sel = z < best[idx]
+        else:
+            sel = visible[idx] < 0
+        idx = idx[sel]
+        best[idx], coords[idx], visible[idx] = z[sel], uv[sel], i
+    # Sample colors once per point from the selected camera
+    colors = np.empty((n, 3), dtype=np.uint8)
+    colors[:] = background
+    for i, image in enumerate(images):
+        idx = np.flatnonzero(visible == i)
+        if idx.size == 0:
+            continue
+        if is_tensor(image):
+            image = image.detach().cpu().numpy().transpose(1, 2, 0)
+        # Only sample color channels (e.g. from RGBA images)
+        if image.ndim == 3:
+            image = image[..., :3]
+        scale = 255.0 if np.issubdtype(image.dtype, np.floating) else 1.0
+        values = bilinear(image, coords[idx])
+        values *= scale
+        values += 0.5
+        colors[idx] = np.clip(values, 0, 255)
+    return colors, visible
@@ -0,0 +1,100 @@
+# Copyright 2023 Toyota Research Institute.  All rights reserved.
+
+import numpy as np
+
+
+def distort(xy, D, model='brown'):
+    """
+    Apply lens distortion to normalized image coordinates
+
+    Parameters
+    ----------
+    xy : np.array [N,2]
+        Undistorted normalized coordinates (x/z, y/z)
+    D : np.array
+        Distortion coefficients
+        Brown-Conrady: (k1, k2, p1, p2[, k3]), equidistant fisheye: (k1, k2, k3, k4)
+    model : str
+        Distortion model ['brown', 'fisheye']
+
+    Returns
+    -------
+    xy : np.array [N,2]
+        Distorted normalized coordinates
+    """
+    x, y = xy[:, 0], xy[:, 1]
+    r2 = x * x + y * y
+    if model == 'brown':
+        k1, k2, p1, p2 = D[:4]
+        k3 = D[4] if len(D) > 4 else 0.0
+        radial = 1.0 + r2 * (k1 + r2 * (k2 + r2 * k3))
+        xd = x * radial + 2.0 * p1 * x * y + p2 * (r2 + 2.0 * x * x)
+        yd = y * radial + p1 * (r2 + 2.0 * y * y) + 2.0 * p2 * x * y
+        return np.stack([xd, yd], 1)
+    elif model == 'fisheye':
+        r = np.sqrt(r2)
+        theta = np.arctan(r)
+        t2 = theta * theta
+        theta_d = theta * (1.0 + t2 * (D[0] + t2 * (D[1] + t2 * (D[2] + t2 * D[3]))))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            scale = np.where(r > 1e-8, theta_d / r, 1.0)
+        return xy * scale[:, np.newaxis]
+    else:
+        raise ValueError('Invalid distortion model')
+
+
+def undistort(xy, D, model='brown', iters=20):
+    """
+    Remove lens distortion from normalized image coordinates (iteratively)
+
+    Parameters
+    ----------
+    xy : np.array [N,2]
+        Distorted normalized coordinates
+    D : np.array
+        Distortion coefficients
+        Brown-Conrady: (k1, k2, p1, p2[, k3]), equidistant fisheye: (k1, k2, k3, k4)
+    model : str
+        Distortion model ['brown', 'fisheye']
+    iters : int
+        Number of iterations
+
+    Returns
+    -------
+    xy : np.array [N,2]
+        Undistorted normalized coordinates (NaN where the iterations did not converge)
+    """
+    if model == 'brown':
+        k1, k2, p1, p2 = D[:4]
+        k3 = D[4] if len(D) > 4 else 0.0
+        xd, yd = xy[:, 0], xy[:, 1]
+        x, y = xd.copy(), yd.copy()
+        # Fixed-point iteration on the distortion equations
+        with np.errstate(all='ignore'):
+            for _ in range(iters):
+                r2 = x * x + y * y
+                radial = 1.0 + r2 * (k1 + r2 * (k2 + r2 * k3))
+                dx = 2.0 * p1 * x * y + p2 * (r2 + 2.0 * x * x)
+                dy = p1 * (r2 + 2.0 * y * y) + 2.0 * p2 * x * y
+                x, y = (xd - dx) / radial, (yd - dy) / radial
+        undist = np.stack([x, y], 1)
+    elif model == 'fisheye':
+        theta_d = np.sqrt(xy[:, 0] ** 2 + xy[:, 1] ** 2)
+        theta = theta_d.copy()
+        # Newton iterations on theta_d = f(theta)
+        with np.errstate(all='ignore'):
+            for _ in range(iters):
+                t2 = theta * theta
+                f = theta * (1.0 + t2 * (D[0] + t2 * (D[1] + t2 * (D[2] + t2 * D[3])))) - theta_d
+                df = 1.0 + t2 * (3.0 * D[0] + t2 * (5.0 * D[1] + t2 * (7.0 * D[2] + t2 * 9.0 * D[3])))
+                theta = theta - f / df
+            scale = np.where(theta_d > 1e-8, np.tan(theta) / theta_d, 1.0)
+            scale[~((theta >= 0) & (theta < np.pi / 2))] = np.nan
+        undist = xy * scale[:, np.newaxis]
+    else:
+        raise ValueError('Invalid distortion model')
+    # Invalidate coordinates that do not map back to the distorted ones
+    with np.errstate(all='ignore'):
+        error = np.abs(distort(undist, D, model) - xy).max(1)
+        undist[~(error < 1e-4)] = np.nan
+    return undist
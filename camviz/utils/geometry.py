@@ -21,3 +21,70 @@ def transpose(data):
 def invert(data):
     """Invert numpy array"""
     return np.linalg.inv(data)
+
+def transform(xyz, T):
+    """Apply a rigid transformation [4,4] to points [N,3] (keeping their floating point type)"""
+    if not np.issubdtype(xyz.dtype, np.floating):
+        xyz = xyz.astype(np.float32)
+    T = T.astype(xyz.dtype, copy=False)
+    out = xyz @ T[:3, :3].T
+    out += T[:3, 3]
+    return out
+
+def quat2rotmat(q):
+    """Convert quaternions [...,4] (w,x,y,z) to rotation matrices [...,3,3]"""
+    q = np.asarray(q)
+    w, x, y, z = q[..., 0], q[..., 1], q[..., 2], q[..., 3]
+    xx, yy, zz = x * x, y * y, z * z
+    xy, xz, yz = x * y, x * z, y * z
+    wx, wy, wz = w * x, w * y, w * z
+    R = np.stack([1 - 2 * (yy + zz), 2 * (xy - wz), 2 * (xz + wy),
+                  2 * (xy + wz), 1 - 2 * (xx + zz), 2 * (yz - wx),
+                  2 * (xz - wy), 2 * (yz + wx), 1 - 2 * (xx + yy)], -1)
+    return R.reshape(q.shape[:-1] + (3, 3))
+
+def rotmat2quat(R):
+    """Convert rotation matrices [...,3,3] to unit quaternions [...,4] (w,x,y,z), with w >= 0"""
+    R = np.asarray(R)
+    m = R.reshape(-1, 9)
+    m00, m01, m02, m10, m11, m12, m20, m21, m22 = m.T
+    # Candidate quaternions scaled by 4*w, 4*x, 4*y and 4*z (Shepperd's method)
+    cands = np.stack([
+        np.stack([1 + m00 + m11 + m22, m21 - m12, m02 - m20, m10 - m01], -1),
+        np.stack([m21 - m12, 1 + m00 - m11 - m22, m01 + m10, m02 + m20], -1),
+        np.stack([m02 - m20, m01 + m10, 1 - m00 + m11 - m22, m12 + m21], -1),
+        np.stack([m10 - m01, m02 + m20, m12 + m21, 1 - m00 - m11 + m22], -1)], 1)
+    # Use the candidate with the largest component, which is always well conditioned
+    best = np.stack([m00 + m11 + m22, m00, m11, m22], -1).argmax(-1)
+    q = cands[np.arange(m.shape[0]), best]
+    q /= np.linalg.norm(q, axis=-1, keepdims=True)
+    q *= np.where(q[:, :1] < 0, -1.0, 1.0).astype(q.dtype)
+    return q.reshape(R.shape[:-2] + (4,))
+
+def perspective(fovy, aspect, near, far):
+    """Return a perspective projection matrix [4,4] (same as gluPerspective, row-major)"""
+    f = 1.0 / np.tan(np.radians(fovy) / 2.0)
+    return np.array([[f / aspect, 0.0, 0.0, 0.0],
+                     [0.0, f, 0.0, 0.0],
+                     [0.0, 0.0, (far + near) / (near - far), 2.0 * far * near / (near - far)],
+                     [0.0, 0.0, -1.0, 0.0]])
+
+def ortho2d(left, right, bottom, top):
+    """Return an orthographic projection matrix [4,4] (same as gluOrtho2D, row-major)"""
+    return np.array([[2.0 / (right - left), 0.0, 0.0, - (right + left) / (right - left)],
+                     [0.0, 2.0 / (top - bottom), 0.0, - (top + bottom) / (top - bottom)],
+                     [0.0, 0.0, -1.0, 0.0],
+                     [0.0, 0.0, 0.0, 1.0]])
+
+def look_at(eye, center, up):
+    """Return a view matrix [4,4] (same as gluLookAt, row-major)"""
+    eye = np.asarray(eye, dtype=np.float64)
+    f = np.asarray(center, dtype=np.float64) - eye
+    f = f / np.linalg.norm(f)
+    s = np.cross(f, up)
+    s = s / np.linalg.norm(s)
+    u = np.cross(s, f)
+    M = np.eye(4)
+    M[0, :3], M[1, :3], M[2, :3] = s, u, -f
+    M[:3, 3] = - M[:3, :3] @ eye
+    return M
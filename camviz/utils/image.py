@@ -24,3 +24,54 @@ def load_image(file, shape=None):
         image = image.resize(shape, resample=Image.ANTIALIAS)
     return np.array(image)
 
+def load_rgb(file, shape=None, dtype=np.float32):
+    """
+    Load an RGB image for texture display
+
+    Parameters
+    ----------
+    file : str
+        Image filename
+    shape : tuple (width, height)
+        Optional reshape size
+    dtype : numpy type
+        Output type (np.uint8 keeps values in [0,255], otherwise normalized to [0,1])
+
+    Returns
+    -------
+    image : np.array [H,W,3]
+        Loaded image
+    """
+    image = Image.open(file).convert('RGB')
+    if shape:
+        image = image.resize(shape, resample=Image.BILINEAR)
+    if dtype == np.uint8:
+        return np.asarray(image, dtype=np.uint8)
+    image = np.asarray(image, dtype=dtype)
+    image *= 1.0 / 255.0
+    return image
+
+def load_depth(file, scale=256.0, shape=None):
+    """
+    Load a 16-bit depth map stored as a PNG image
+
+    Parameters
+    ----------
+    file : str
+        Depth map filename
+    scale : float
+        Scale used to convert stored values to metric depth
+    shape : tuple (width, height)
+        Optional reshape size (nearest neighbor, to avoid mixing depth values)
+
+    Returns
+    -------
+    depth : np.array [H,W]
+        Loaded depth map (float32)
+    """
+    depth = Image.open(file)
+    if shape:
+        depth = depth.resize(shape, resample=Image.NEAREST)
+    depth = np.asarray(depth, dtype=np.float32)
+    depth *= 1.0 / scale
+    return depth
@@ -0,0 +1,306 @@
+# Copyright 2023 Toyota Research Institute.  All rights reserved.
+
+import re
+
+import numpy as np
+
+# PLY property types
+PLY_TYPES = {
+    'char': 'i1', 'int8': 'i1', 'uchar': 'u1', 'uint8': 'u1',
+    'short': 'i2', 'int16': 'i2', 'ushort': 'u2', 'uint16': 'u2',
+    'int': 'i4', 'int32': 'i4', 'uint': 'u4', 'uint32': 'u4',
+    'float': 'f4', 'float32': 'f4', 'double': 'f8', 'float64': 'f8',
+}
+
+
+def triangulate(polys, counts=None):
+    """
+    Split polygons into triangles (using fans around the first vertex)
+
+    Parameters
+    ----------
+    polys : np.array [F,K] or list[np.array]
+        Polygon vertex indexes (same number of vertices, or one array per polygon)
+    counts : np.array [F]
+        Number of vertices per polygon (if polys is a flat array of concatenated indexes)
+
+    Returns
+    -------
+    faces : np.array [T,3]
+        Triangle vertex indexes (uint32)
+    """
+    # Same number of vertices for all polygons
+    if counts is None:
+        polys = np.asarray(polys)
+        k = polys.shape[1]
+        fan = np.stack([np.zeros(k - 2, dtype=np.int64),
+                        np.arange(1, k - 1), np.arange(2, k)], 1)
+        return polys[:, fan].reshape(-1, 3).astype(np.uint32)
+    # Variable number of vertices per polygon
+    counts = np.asarray(counts, dtype=np.int64)
+    starts = np.zeros(counts.shape[0], dtype=np.int64)
+    np.cumsum(counts[:-1], out=starts[1:])
+    ntris = np.maximum(counts - 2, 0)
+    # First vertex and consecutive pairs for each triangle in the fan
+    tri_poly = np.repeat(np.arange(counts.shape[0]), ntris)
+    tri_k = np.arange(ntris.sum()) - np.repeat(np.cumsum(ntris) - ntris, ntris)
+    base = starts[tri_poly]
+    return np.stack([polys[base], polys[base + tri_k + 1], polys[base + tri_k + 2]], 1).astype(np.uint32)
+
+
+def compute_normals(vertices, faces):
+    """
+    Compute per-vertex normals by accumulating area-weighted face normals
+
+    Parameters
+    ----------
+    vertices : np.array [N,3]
+        Mesh vertices
+    faces : np.array [F,3]
+        Triangle vertex indexes
+
+    Returns
+    -------
+    normals : np.array [N,3]
+        Unitary vertex normals (float32)
+    """
+    vertices = np.asarray(vertices, dtype=np.float32)
+    tris = vertices[faces.astype(np.int64)]
+    face_normals = np.cross(tris[:, 1] - tris[:, 0], tris[:, 2] - tris[:, 0])
+    # Accumulate with bincount, which is much faster than unbuffered additions
+    idx = faces.astype(np.int64).reshape(-1)
+    normals = np.stack([np.bincount(idx, weights=np.repeat(face_normals[:, c], 3),
+                                    minlength=vertices.shape[0]) for c in range(3)], 1).astype(np.float32)
+    norm = np.linalg.norm(normals, axis=1, keepdims=True)
+    return normals / np.maximum(norm, 1e-12)
+
+
+def _ply_header(file):
+    """Parse a PLY header, returning format, elements and header size in bytes"""
+    elements, fmt = [], None
+    with open(file, 'rb') as f:
+        assert f.readline().strip() == b'ply', 'Invalid PLY file'
+        while True:
+            line = f.readline()
+            assert len(line) > 0, 'Invalid PLY header'
+            tokens = line.decode('ascii').split()
+            if len(tokens) == 0 or tokens[0] in ['comment', 'obj_info']:
+                continue
+            if tokens[0] == 'format':
+                fmt = tokens[1]
+            elif tokens[0] == 'element':
+                elements.append({'name': tokens[1], 'count': int(tokens[2]), 'props': []})
+            elif tokens[0] == 'property':
+                # List properties store count and item types
+                if tokens[1] == 'list':
+                    elements[-1]['props'].append((tokens[4], PLY_TYPES[tokens[2]], PLY_TYPES[tokens[3]]))
+                else:
+                    elements[-1]['props'].append((tokens[2], PLY_TYPES[tokens[1]], None))
+            elif tokens[0] == 'end_header':
+                return fmt, elements, f.tell()
+
+
+def _ply_vertices(data, names):
+    """Extract vertices, normals and colors from PLY vertex properties"""
+    def stack(keys, dtype):
+        return np.stack([np.asarray(data[key], dtype=dtype) for key in keys], 1) \
+            if all(key in names for key in keys) else None
+    mesh = {'vertices': stack(['x', 'y', 'z'], np.float32),
+            'normals': stack(['nx', 'ny', 'nz'], np.float32),
+            'colors': None}
+    # Colors are stored as uint8 (converting float colors if necessary)
+    for keys in [['red', 'green', 'blue'], ['r', 'g', 'b']]:
+        if all(key in names for key in keys):
+            colors = np.stack([np.asarray(data[key]) for key in keys], 1)
+            if np.issubdtype(colors.dtype, np.floating):
+                colors = np.rint(np.clip(colors, 0.0, 1.0) * 255.0)
+            mesh['colors'] = colors.astype(np.uint8)
+            break
+    return mesh
+
+
+def _ply_list_heads(lengths, csize, isize, count):
+    """
+    Find where each entry of a PLY list property starts, without walking entries one by one
+
+    Parameters
+    ----------
+    lengths : np.array [P]
+        List length that would be read at every position (token or byte)
+    csize : int
+        Size of the length field
+    isize : int
+        Size of each list item
+    count : int
+        Number of entries
+
+    Returns
+    -------
+    heads : np.array [count]
+        Entry start positions
+    """
+    # Entry i+1 starts right after entry i, so compute the successor of every possible position
+    n = lengths.shape[0]
+    jump = np.empty(n + 1, dtype=np.int64)
+    jump[:n] = np.arange(csize, n + csize) + lengths.astype(np.int64) * isize
+    np.clip(jump, 0, n, out=jump)
+    jump[n] = n
+    # Follow the chain from the first entry by pointer doubling (each step doubles the known entries)
+    heads = np.zeros(min(count, 1), dtype=np.int64)
+    while heads.shape[0] < count:
+        heads = np.concatenate([heads, jump[heads]])
+        if heads.shape[0] < count:
+            jump = jump[jump]
+    heads = heads[:count]
+    if count > 0 and heads[-1] + csize + int(lengths[heads[-1]]) * isize > n:
+        raise ValueError('Truncated PLY list property')
+    return heads
+
+
+def load_ply(file):
+    """
+    Load a PLY mesh (binary files are memory-mapped)
+
+    Parameters
+    ----------
+    file : str
+        PLY file
+
+    Returns
+    -------
+    mesh : dict
+        Mesh with vertices [N,3], normals [N,3] (or None), colors [N,3] uint8 (or None)
+        and triangle faces [F,3] uint32 (or None for pointclouds)
+    """
+    fmt, elements, offset = _ply_header(file)
+    mesh, faces = None, None
+    # ASCII files are parsed as a single array of tokens
+    if fmt == 'ascii':
+        with open(file, 'rb') as f:
+            f.seek(offset)
+            tokens = np.array(f.read().split(), dtype=np.float64)
+        pos = 0
+        for element in elements:
+            count, props = element['count'], element['props']
+            if all(prop[2] is None for prop in props):
+                values = tokens[pos:pos + count * len(props)].reshape(count, len(props))
+                pos += count * len(props)
+                if element['name'] == 'vertex':
+                    names = [prop[0] for prop in props]
+                    mesh = _ply_vertices({name: values[:, i] for i, name in enumerate(names)}, names)
+            elif element['name'] == 'face' and len(props) == 1:
+                # Try a fixed number of vertices per face first
+                k = int(tokens[pos]) if count > 0 else 3
+                polys = tokens[pos:pos + count * (k + 1)]
+                if polys.shape[0] == count * (k + 1) and np.all(polys[::k + 1] == k):
+                    faces = triangulate(polys.reshape(count, k + 1)[:, 1:].astype(np.int64))
+                    pos += count * (k + 1)
+                else:
+                    # Variable number of vertices per face
+                    heads = pos + _ply_list_heads(tokens[pos:], 1, 1, count)
+                    counts = tokens[heads].astype(np.int64)
+                    items = np.repeat(heads + 1 - (np.cumsum(counts) - counts), counts) + np.arange(counts.sum())
+                    faces = triangulate(tokens[items].astype(np.int64), counts)
+                    pos = int(heads[-1] + 1 + counts[-1])
+            else:
+                break
+    # Binary files are memory-mapped using structured types
+    else:
+        endian = '<' if fmt == 'binary_little_endian' else '>'
+        for element in elements:
+            count, props = element['count'], element['props']
+            if all(prop[2] is None for prop in props):
+                dtype = np.dtype([(name, endian + t) for name, t, _ in props])
+                data = np.memmap(file, dtype=dtype, mode='r', offset=offset, shape=(count,))
+                offset += count * dtype.itemsize
+                if element['name'] == 'vertex':
+                    mesh = _ply_vertices(data, dtype.names)
+            elif element['name'] == 'face' and len(props) == 1:
+                _, tcount, titem = props[0]
+                ccount, citem = np.dtype(endian + tcount), np.dtype(endian + titem)
+                # Try a fixed number of vertices per face first
+                with open(file, 'rb') as f:
+                    f.seek(offset)
+                    k = int(np.frombuffer(f.read(ccount.itemsize), dtype=ccount)[0]) if count > 0 else 3
+                dtype = np.dtype([('n', ccount), ('idx', citem, (k,))])
+                size = count * dtype.itemsize
+                data = np.memmap(file, dtype=np.uint8, mode='r', offset=offset)
+                polys = np.frombuffer(data[:size], dtype=dtype) if data.shape[0] >= size else None
+                if polys is not None and np.all(polys['n'] == k):
+                    faces = triangulate(polys['idx'])
+                else:
+                    # Variable number of vertices per face, reading count fields at every byte
+                    raw, size = np.asarray(data), max(data.shape[0] - ccount.itemsize + 1, 0)
+                    lengths = np.zeros(data.shape[0], dtype=ccount)
+                    lengths[:size] = np.lib.stride_tricks.as_strided(
+                        raw, (size, ccount.itemsize), (1, 1)).copy().view(ccount).reshape(-1)
+                    heads = _ply_list_heads(lengths, ccount.itemsize, citem.itemsize, count)
+                    counts = lengths[heads].astype(np.int64)
+                    # Gather the bytes of every list item
+                    first = heads + ccount.itemsize - citem.itemsize * (np.cumsum(counts) - counts)
+                    items = np.repeat(first, counts) + citem.itemsize * np.arange(counts.sum())
+                    polys = raw[items[:, np.newaxis] + np.arange(citem.itemsize)].view(citem).reshape(-1)
+                    faces = triangulate(polys.astype(np.int64), counts)
+                break
+            else:
+                break
+    assert mesh is not None and mesh['vertices'] is not None, 'PLY file without vertices'
+    mesh['faces'] = faces
+    return mesh
+
+
+def load_obj(file):
+    """
+    Load an OBJ mesh (vertices, optional vertex colors, normals and faces)
+
+    Parameters
+    ----------
+    file : str
+        OBJ file
+
+    Returns
+    -------
+    mesh : dict
+        Mesh with vertices [N,3], normals [N,3] (or None), colors [N,3] uint8 (or None)
+        and triangle faces [F,3] uint32
+    """
+    with open(file, 'r') as f:
+        text = f.read()
+    # Group lines by their prefixes
+    def lines(prefix):
+        return re.findall(r'^%s\s+(.*)$' % prefix, text, flags=re.MULTILINE)
+    # Parse vertices (with optional colors)
+    verts = lines('v')
+    k = len(verts[0].split())
+    values = np.array(' '.join(verts).split(), dtype=np.float32).reshape(-1, k)
+    mesh = {'vertices': values[:, :3], 'normals': None, 'colors': None}
+    if k >= 6:
+        mesh['colors'] = np.rint(np.clip(values[:, 3:6], 0.0, 1.0) * 255.0).astype(np.uint8)
+    # Parse faces, keeping only vertex indexes
+    polys = lines('f')
+    if len(polys) > 0:
+        counts = np.array([len(poly.split()) for poly in polys])
+        idx = np.array(re.sub(r'/\S*', '', ' '.join(polys)).split(), dtype=np.int64)
+        # Convert relative and one-based indexes
+        idx = np.where(idx < 0, idx + values.shape[0], idx - 1)
+        if np.all(counts == counts[0]):
+            mesh['faces'] = triangulate(idx.reshape(-1, counts[0]))
+        else:
+            mesh['faces'] = triangulate(idx, counts)
+    else:
+        mesh['faces'] = None
+    # Use normals only if they map one to one to vertices
+    normals = lines('vn')
+    if len(normals) == values.shape[0]:
+        mesh['normals'] = np.array(' '.join(normals).split(), dtype=np.float32).reshape(-1, 3)
+    return mesh
+
+
+def load_mesh(file):
+    """Load a PLY or OBJ mesh, depending on its extension"""
+    if file.lower().endswith('.ply'):
+        return load_ply(file)
+    elif file.lower().endswith('.obj'):
+        return load_obj(file)
+    else:
+        raise ValueError('Invalid mesh file')
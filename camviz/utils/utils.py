@@ -1,8 +1,8 @@
 # Copyright 2023 Toyota Research Institute.  All rights reserved.
 
 import numpy as np
-from matplotlib.cm import get_cmap
 
+from camviz.utils.cmaps import colormap as apply_colormap, RangeEstimator, sample_percentile
 from camviz.utils.types import is_numpy, is_tensor
 
 
@@ -11,8 +11,8 @@ def add_row0(npy):
     return np.vstack([npy, np.zeros((1, npy.shape[1]))])
 
 def add_col1(npy):
-    """Add a column with ones to a numpy array"""
-    return np.hstack([npy, np.ones((npy.shape[0], 1))])
+    """Add a column with ones to a numpy array (keeping float32 if possible)"""
+    return np.hstack([npy, np.ones((npy.shape[0], 1), dtype=np.result_type(npy.dtype, np.float32))])
 
 def flatten(lst):
     """Flatten a list of lists into a list"""
@@ -54,12 +54,11 @@ def alternate_points(x1, x2):
 
 
 def vis_inverse_depth(inv_depth, normalizer=None, percentile=95, colormap='plasma'):
-    cm = get_cmap(colormap)
-    if normalizer:
-        inv_depth /= normalizer
-    else:
-        inv_depth /= (np.percentile(inv_depth, percentile) + 1e-6)
-    return cm(np.clip(inv_depth, 0., 1.0))[:, :, :3]
+    if isinstance(normalizer, RangeEstimator):
+        normalizer = normalizer.update(inv_depth)[1] + 1e-6
+    elif not normalizer:
+        normalizer = sample_percentile(inv_depth, percentile) + 1e-6
+    return apply_colormap(inv_depth, colormap, range=(0.0, normalizer))
 
 
 def grid_idx(grid):
@@ -35,10 +35,10 @@ camera = cv.objects.Camera(K=intrinsics, wh=wh)
 # Project depth maps from image (i) to camera (c) coordinates
 points = camera.i2c(depth)
 
-# Create pointcloud colors
+# Create pointcloud colors and attributes
 rgb_clr = rgb.reshape(-1, 3)                   # RGB colors
 viz_clr = viz.reshape(-1, 3)                   # Depth visualization colors
-hgt_clr = cv.utils.cmaps.jet(-points[:, 1])    # Height colors
+hgt_att = -points[:, 1]                        # Heights (colormapped when drawing)
 
 # Create RGB and visualization textures
 draw.addTexture('rgb', rgb)  # Create texture buffer to store rgb image
@@ -48,7 +48,7 @@ draw.addTexture('viz', viz)  # Create texture buffer to store visualization imag
 draw.addBufferf('pts', points)   # Create data buffer to store depth points
 draw.addBufferf('clr', rgb_clr)  # Create data buffer to store rgb points color
 draw.addBufferf('viz', viz_clr)  # Create data buffer to store pointcloud heights
-draw.addBufferf('hgt', hgt_clr)  # Create data buffer to store pointcloud heights
+draw.addBufferAttr('hgt', hgt_att)  # Create attribute buffer to store pointcloud heights
 
 # Color dictionary
 color_dict = {0: 'clr', 1: 'viz', 2: 'hgt'}